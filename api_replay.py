@@ -0,0 +1,161 @@
+import os, json, time, datetime, threading
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+from ratelimit import polite_request, CircuitOpen
+from consent_state import STATE_DIR
+
+# Replay das APIs JSON de listagem das lojas.
+# Na 1ª visita renderizada, o XHR com mais produtos dá o modelo do pedido (URL, query,
+# headers, corpo) e o parâmetro de paginação (page/offset). As páginas seguintes vêm
+# por HTTP (sessão com pool, via o mesmo proxy), sem load_more/scroll. O modelo fica
+# guardado por loja e o run seguinte começa logo pelo replay; se falhar ou deixar de
+# devolver produtos (API mudou), o modelo é apagado e a categoria volta a ser renderizada.
+#   API_REPLAY=1 (default) | 0     API_MAX_PAGES="50"     API_MIN_ITEMS="5"
+
+TEMPLATES     = STATE_DIR / "api_templates.json"
+API_REPLAY    = os.getenv("API_REPLAY", "1") != "0"
+API_MAX_PAGES = int(os.getenv("API_MAX_PAGES", "50"))
+API_MIN_ITEMS = int(os.getenv("API_MIN_ITEMS", "5"))   # menos que isto não é uma listagem
+
+PAGE_KEYS   = {"page", "p", "pg", "pagenumber", "currentpage", "pageindex"}
+OFFSET_KEYS = {"offset", "start", "from", "skip", "startindex"}
+SIZE_KEYS   = {"size", "limit", "pagesize", "per_page", "perpage", "rows", "hitsperpage"}
+DROP_HEADERS = {"cookie", "content-length", "host", "accept-encoding", "connection"}
+
+def find_key(params: dict, names: set):
+    for k, v in params.items():
+        if str(k).lower() in names:
+            try: return k, int(v)
+            except (TypeError, ValueError): pass
+    return None, None
+
+def body_params(body):
+    try:
+        data = json.loads(body) if body else None
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+def learn(url: str, method: str, headers: dict, body, n_items: int):
+    """Modelo de replay a partir de um XHR de listagem, ou None se não tiver paginação."""
+    if n_items < API_MIN_ITEMS: return None
+    for where, params in (("query", dict(parse_qsl(urlparse(url).query))), ("body", body_params(body) or {})):
+        key, val = find_key(params, PAGE_KEYS); kind = "page"
+        if key is None:
+            key, val = find_key(params, OFFSET_KEYS); kind = "offset"
+        if key is None: continue
+        _, size = find_key(params, SIZE_KEYS)
+        return {
+            "method": method.upper(), "url": url, "body": body,
+            "headers": {k: v for k, v in headers.items() if not k.startswith(":") and k.lower() not in DROP_HEADERS},
+            "where": where, "key": key, "kind": kind, "start": val,
+            "step": 1 if kind == "page" else (size or n_items),
+            "items": n_items, "learned_at": datetime.date.today().isoformat(),
+        }
+    return None
+
+def page_request(tpl: dict, i: int):
+    """(url, corpo) da página i (0 = a página gravada)."""
+    val = tpl["start"] + i * tpl["step"]
+    url, body = tpl["url"], tpl["body"]
+    if tpl["where"] == "query":
+        u = urlparse(url)
+        q = dict(parse_qsl(u.query)); q[tpl["key"]] = str(val)
+        url = urlunparse(u._replace(query=urlencode(q)))
+    else:
+        data = body_params(body); data[tpl["key"]] = val
+        body = json.dumps(data)
+    return url, body
+
+def requests_proxy(proxy):
+    # proxy do Playwright {"server": "socks5://..."} → requests (socks5h: DNS do lado do Tor)
+    if not proxy: return None
+    server = proxy["server"].replace("socks5://", "socks5h://")
+    return {"http": server, "https": server}
+
+class TemplateStore:
+    def __init__(self, path=TEMPLATES):
+        self.path = path
+        self.templates = {}   # loja → {url da categoria: modelo}
+        if self.path.exists():
+            try: self.templates = json.loads(self.path.read_text(encoding="utf-8"))
+            except ValueError: self.templates = {}
+        self.sessions = {}
+        self.lock = threading.RLock()   # replays correm em threads (asyncio.to_thread); put/drop → flush
+        self.stats = {}       # loja → [fontes por replay, pedidos, fallbacks, segundos]
+
+    def session(self, proxy=None):
+        # uma Session por proxy → keep-alive e pool de ligações (o circuito Tor fica o mesmo)
+        key = proxy["server"] if proxy else ""
+        with self.lock:   # replays em asyncio.to_thread: uma só Session por proxy
+            if key not in self.sessions:
+                import requests
+                from requests.adapters import HTTPAdapter
+                s = requests.Session()
+                a = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+                s.mount("https://", a); s.mount("http://", a)
+                if proxy: s.proxies.update(requests_proxy(proxy))
+                self.sessions[key] = s
+            return self.sessions[key]
+
+    def get(self, store: str, url: str):
+        if not API_REPLAY: return None
+        with self.lock: return self.templates.get(store, {}).get(url)
+
+    def put(self, store: str, url: str, tpl: dict):
+        with self.lock:
+            self.templates.setdefault(store, {})[url] = tpl
+            self.flush()
+
+    def drop(self, store: str, url: str):
+        with self.lock:
+            if self.templates.get(store, {}).pop(url, None) is not None:
+                self.flush()
+
+    def count(self, store: str, ok=0, reqs=0, fb=0, secs=0.0):
+        with self.lock:
+            st = self.stats.setdefault(store, [0, 0, 0, 0.0])
+            st[0] += ok; st[1] += reqs; st[2] += fb; st[3] += secs
+
+    def replay(self, store: str, url: str, tpl: dict, extract, start=0, proxy=None, prev=None):
+        """Produtos das páginas start.. via HTTP; None se falhar/derivar (→ renderizar).
+        `prev`: nomes da página anterior já vista no browser. Bloqueante (requests +
+        limitador): chamar com asyncio.to_thread."""
+        t0 = time.monotonic(); out = []
+        try:
+            for i in range(start, API_MAX_PAGES):
+                purl, body = page_request(tpl, i)
+                r = polite_request(tpl["method"], purl, session=self.session(proxy), timeout=30,
+                                   headers=tpl["headers"], data=body if tpl["method"] != "GET" else None)
+                items = extract(r.json())
+                self.count(store, reqs=1)
+                if i == 0 and len(items) < API_MIN_ITEMS:
+                    raise ValueError(f"só {len(items)} itens na 1ª página (API mudou?)")
+                names = [it.get("name") for it in items]
+                if not items or names == prev: break   # fim, ou a API ignora o parâmetro
+                out.extend(items); prev = names
+                if len(items) < tpl["items"]: break     # página incompleta = última
+        except CircuitOpen as e:
+            # host em pausa: o modelo continua válido
+            print(f"[{store}] API replay adiado ({e})")
+            self.count(store, fb=1)
+            return None
+        except Exception as e:
+            print(f"[{store}] API replay falhou ({e}) — volta a renderizar {url}")
+            self.count(store, fb=1, secs=time.monotonic() - t0)
+            self.drop(store, url)
+            return None
+        self.count(store, ok=1, secs=time.monotonic() - t0)
+        return out
+
+    def flush(self):
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.templates, indent=1, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    def report(self):
+        for store, (ok, reqs, fb, secs) in sorted(self.stats.items()):
+            print(f"[api] {store}: replay em {ok} fontes, {reqs} pedidos, {secs:.1f}s, fallback={fb}")
+
+API = TemplateStore()
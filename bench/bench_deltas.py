@@ -0,0 +1,61 @@
+"""Benchmark do deltas.py: tempo do diff entre dois snapshots grandes.
+
+Uso: python bench/bench_deltas.py [--rows 1000000] [--change 0.02]
+
+Gera um snapshot base e um segundo com ~change de preços/promos alterados,
+produtos novos e removidos, e mede o run de baseline e o run de diff.
+"""
+import sys, csv, time, random, tempfile, argparse, resource
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import deltas
+
+def write_snapshot(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f); w.writerow(["ProductUID","NomeProduto","Loja","Preco","IsPromo","FetchedAt"])
+        for uid, loja, p, promo in rows:
+            w.writerow([uid, uid.replace("-", " "), loja, p, promo, "2025-01-01T06:00:00Z"])
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--change", type=float, default=0.02, help="fração de linhas alteradas")
+    a = ap.parse_args()
+
+    rnd = random.Random(42)
+    stores = ["ALDI","AUCHAN","CACTUS","COLRUYT","DELHAIZE","LIDL"]
+    base = [(f"produto-{i}", stores[i % len(stores)], round(0.5 + rnd.random() * 20, 2),
+             "TRUE" if rnd.random() < 0.05 else "FALSE") for i in range(a.rows)]
+    nxt = list(base)
+    n = int(a.rows * a.change)
+    for i in rnd.sample(range(a.rows), n):
+        uid, loja, p, promo = nxt[i]
+        if rnd.random() < 0.5: p = round(p * (0.8 + rnd.random() * 0.4), 2)
+        else: promo = "FALSE" if promo == "TRUE" else "TRUE"
+        nxt[i] = (uid, loja, p, promo)
+    gone = set(rnd.sample(range(a.rows), n // 4))
+    nxt = [r for i, r in enumerate(nxt) if i not in gone]
+    nxt += [(f"novo-{i}", stores[i % len(stores)], 1.99, "FALSE") for i in range(n // 4)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_snapshot(tmp / "a.csv", base); write_snapshot(tmp / "b.csv", nxt)
+        ddir = tmp / "deltas"
+        t0 = time.perf_counter()
+        deltas.run(tmp / "a.csv", ddir, tmp / "deltas.csv", run_id="20250101T000000Z")
+        t1 = time.perf_counter()
+        e = deltas.run(tmp / "b.csv", ddir, tmp / "deltas.csv", run_id="20250102T000000Z")
+        t2 = time.perf_counter()
+        got = sum(1 for _ in deltas.since("20250101T000000Z", ddir))
+        t3 = time.perf_counter()
+        jsonl = (ddir / e["file"]).stat().st_size / 1024
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"linhas: {a.rows:,} → {len(nxt):,}")
+    print(f"baseline: {t1-t0:.2f}s   diff: {t2-t1:.2f}s ({len(nxt)/(t2-t1)/1e3:.0f}k linhas/s)")
+    print(f"deltas: {e['n']:,} {e['counts']}  JSONL {jsonl:.0f} KB")
+    print(f"since(): {got:,} deltas em {(t3-t2)*1000:.0f} ms   pico RSS ≈ {rss:.0f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark do image_cache: downloads + miniaturas WebP contra um servidor HTTP local.
+
+Uso: python bench/bench_image_cache.py [--images 300] [--dupes 0.2] [--workers 16] [--parse 0]
+
+Gera imagens JPEG/PNG de vários tamanhos numa pasta temporária, serve-as em 127.0.0.1
+(o SimpleHTTPRequestHandler responde 304 a If-Modified-Since) e corre:
+  1) run frio (tudo novo; parte dos URLs aponta para o mesmo conteúdo com ?itok=)
+  2) run quente (nada a pedir: tudo em cache)
+  3) run de verificação (IMG_RECHECK_DAYS=0: pedidos condicionais → 304)
+"""
+import sys, csv, time, random, tempfile, argparse, threading, functools
+from pathlib import Path
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import image_cache as ic
+from ratelimit import HostLimiter
+
+class Quiet(SimpleHTTPRequestHandler):
+    def log_message(self, *a): pass
+
+def make_fixture(d: Path, n: int, rnd):
+    from PIL import Image, ImageDraw
+    names = []
+    for i in range(n):
+        w, h = rnd.choice([(400, 400), (800, 600), (1200, 1200), (600, 900)])
+        im = Image.new("RGB", (w, h), tuple(rnd.randrange(256) for _ in range(3)))
+        dr = ImageDraw.Draw(im)
+        for _ in range(20):
+            x, y = rnd.randrange(w), rnd.randrange(h)
+            dr.ellipse((x, y, x + w // 5, y + h // 5), fill=tuple(rnd.randrange(256) for _ in range(3)))
+        name = f"img{i}.{'png' if i % 5 == 0 else 'jpg'}"
+        im.save(d / name, quality=85)
+        names.append(name)
+    return names
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--images", type=int, default=300)
+    ap.add_argument("--dupes", type=float, default=0.2, help="fração de produtos com URL diferente p/ a mesma imagem")
+    ap.add_argument("--workers", type=int, default=16)
+    ap.add_argument("--parse", type=int, default=None, help="processos de miniaturas (default: nº de cores)")
+    a = ap.parse_args()
+    rnd = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp); fx = tmp / "fixture"; fx.mkdir()
+        t0 = time.perf_counter()
+        names = make_fixture(fx, a.images, rnd)
+        total_mb = sum(p.stat().st_size for p in fx.iterdir()) / 1e6
+        print(f"fixture: {len(names)} imagens, {total_mb:.1f} MB ({time.perf_counter()-t0:.1f}s)")
+
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Quiet, directory=str(fx)))
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{srv.server_address[1]}"
+
+        cat = tmp / "produtos.csv"
+        with cat.open("w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f); w.writerow(["UID", "Imagem"])
+            for i, n in enumerate(names):
+                w.writerow([f"p{i}", f"{base}/{n}"])
+            for i in range(int(a.images * a.dupes)):   # mesmo ficheiro, URL "rodado"
+                w.writerow([f"d{i}", f"{base}/{rnd.choice(names)}?itok={rnd.randrange(1 << 30):x}"])
+
+        lim = HostLimiter(default_rate=1e6, max_rate=1e6, burst=1e6)   # sem limite no fixture
+        img, out = tmp / "img", tmp / "thumbs.csv"
+        for label, days in (("frio", None), ("quente", None), ("304", 0)):
+            t0 = time.perf_counter()
+            st = ic.refresh(cat, img, out, limiter=lim, workers=a.workers, parse_workers=a.parse,
+                            recheck_days=ic.RECHECK_DAYS if days is None else days)
+            dt = time.perf_counter() - t0
+            n = sum(st.values())
+            print(f"== {label}: {dt:.2f}s, {n} pedidos, {n/dt if dt else 0:.0f} img/s {st}\n")
+        thumbs = list((img).glob("*/*/*.webp"))
+        kb = sum(p.stat().st_size for p in thumbs) / 1024
+        print(f"miniaturas: {len(thumbs)} ficheiros, {kb:.0f} KB ({kb/max(1,len(thumbs)):.1f} KB/miniatura)")
+        srv.shutdown()
+
+if __name__ == "__main__":
+    main()
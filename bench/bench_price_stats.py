@@ -0,0 +1,66 @@
+"""Benchmark do price_stats: tempo de cada atualização incremental à medida que o histórico cresce.
+
+Uso: python bench/bench_price_stats.py [--products 20000] [--stores 6] [--days 365]
+
+Cada dia corre o ciclo completo do main() com ficheiros numa pasta temporária:
+load (price_stats_state.json + price_stats.csv) → merge_run → expire → estatísticas
+→ save (estado + reescrita do CSV). Como a janela é limitada (KEEP_DAYS), o tempo por
+run deve estabilizar depois de ~KEEP_DAYS dias e não crescer com o número total de runs.
+"""
+import sys, time, random, shutil, argparse, datetime, tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import price_stats as ps
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--products", type=int, default=20000)
+    ap.add_argument("--stores", type=int, default=6)
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--touch", type=float, default=0.5, help="fração de produtos vistos por run")
+    a = ap.parse_args()
+
+    rnd = random.Random(42)
+    stores = [f"LOJA{i}" for i in range(a.stores)]
+    uids = [f"produto-{i}" for i in range(a.products)]
+    base = {u: 0.5 + rnd.random() * 20 for u in uids}
+    day0 = datetime.date(2025, 1, 1).toordinal()
+
+    tmp = Path(tempfile.mkdtemp(prefix="easycheck-stats-"))
+    state, out_csv = tmp / "price_stats_state.json", tmp / "price_stats.csv"
+    history = 0
+    marks = {1, 7, 30, 60, 90, 120, 180, 270, 365, a.days}
+    print(f"{'dia':>5} {'linhas hist.':>13} {'linhas run':>11} {'load ms':>8} {'merge ms':>9} {'expire ms':>10} "
+          f"{'stats ms':>9} {'save ms':>8} {'total ms':>9} {'estado KB':>10} {'csv':>7}")
+    for day in range(a.days):
+        today = day0 + day
+        daily = {}
+        for u in rnd.sample(uids, int(len(uids) * a.touch)):
+            for s in stores[: rnd.randint(1, a.stores)]:
+                daily[(s, u, today)] = round(base[u] * (0.8 + rnd.random() * 0.4), 2)
+        history += len(daily)
+
+        t = [time.perf_counter()]
+        series = ps.load_state(state)
+        stats = {(r["Loja"], r["ProductUID"]): r for r in ps.read_csv(out_csv)}
+        t.append(time.perf_counter())
+        touched = ps.merge_run(series, daily, today)
+        t.append(time.perf_counter())
+        gone = ps.expire(series, today); touched -= gone
+        for k in gone: stats.pop(k, None)
+        t.append(time.perf_counter())
+        ps.update_rows(stats, touched, series, today)
+        t.append(time.perf_counter())
+        ps.save_state(series, state)
+        ps.write_csv(out_csv, ps.COLS, stats.values())
+        t.append(time.perf_counter())
+
+        if day + 1 in marks:
+            ms = [(b - a_) * 1000 for a_, b in zip(t, t[1:])]
+            print(f"{day+1:>5} {history:>13} {len(daily):>11} {ms[0]:>8.0f} {ms[1]:>9.1f} {ms[2]:>10.1f} "
+                  f"{ms[3]:>9.1f} {ms[4]:>8.0f} {sum(ms):>9.0f} {state.stat().st_size/1024:>10.0f} {len(stats):>7}")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
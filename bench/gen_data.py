@@ -0,0 +1,119 @@
+"""Gerador de dados sintéticos para os benchmarks do pós-processamento.
+
+Uso: python bench/gen_data.py DIR [--size 10k|1m|10m | --rows N] [--seed 42]
+
+Escreve em DIR/out/ os três CSV de entrada dos estágios, com as mesmas colunas
+que os scrapers produzem:
+  ofertas_full.csv      N linhas (o mesmo produto em várias lojas/dias → duplicados)
+  produtos_primary.csv  N/4 linhas (UID repetido em ~5% das linhas)
+  produtos_off.csv      N/2 linhas (~30% dos UIDs em comum com as lojas)
+Nomes em FR/PT/DE/EN/LU com acentos; ~40% com EAN, o resto com UID = slug.
+Escreve em streaming: o produto i é gerado a partir do próprio índice (sem lista de
+produtos em memória), por isso 10M linhas não passam pela memória.
+"""
+import sys, csv, random, argparse, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from utils import slugify
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+COLS_OFERTAS  = ["ProductUID","EAN","NomeProduto","Loja","Store","Country","Preco","Moeda",
+                 "PrecoUnidade","Unidade","IsPromo","ValidadeDe","ValidadeAte","SourceURL","SourceType","FetchedAt"]
+COLS_PRODUTOS = ["UID","EAN","Nome","Marca","Rayon","SousRayon","Tamanho","Imagem","Fonte","ScoreInicial"]
+COLS_OFF      = COLS_PRODUTOS + ["OFFPrice"]
+
+WORDS = {
+    "fr": ["yaourt", "fromage", "crème fraîche", "pâtes", "épices", "pommes", "thé vert", "céréales",
+           "beurre demi-sel", "jus d'orange", "chocolat noir", "eau gazeuse", "surgelé", "riz basmati"],
+    "pt": ["iogurte", "queijo", "manteiga", "feijão", "açúcar", "arroz", "atum", "bolacha", "água",
+           "café moído", "pão de forma", "sumo de laranja", "azeite virgem"],
+    "de": ["Käse", "Milch", "Brötchen", "Müsli", "Würstchen", "Sahne", "Apfelsaft", "Kräutertee",
+           "Vollkornbrot", "Frühstücksflocken"],
+    "en": ["organic oats", "peanut butter", "energy drink", "frozen peas", "baby food", "cola zero"],
+    "lb": ["Kachkéis", "Gromperekichelcher", "Bouneschlupp", "Quetschentaart", "Rieslingspaschtéit"],
+}
+ADJ    = ["bio", "extra", "nature", "light", "premium", "classique", "tradicional", "frais", "½ écrémé", "sans lactose"]
+BRANDS = ["", "Danone", "Nestlé", "Cactus", "Luxlait", "Président", "Milka", "Bonne Maman", "K-Classic",
+          "Delhaize", "Auchan", "Colruyt Boni", "Mövenpick", "Compal", "Dr. Oetker"]
+QTY    = ["500 g", "1 kg", "250 g", "1 l", "33 cl", "6 x 33 cl", "75 cl", "12 pcs", "150 g", "2 x 125 g", ""]
+STORES = [("CACTUS", "Cactus"), ("AUCHAN", "Auchan"), ("DELHAIZE", "Delhaize"), ("ALDI", "Aldi"),
+          ("LIDL", "Lidl"), ("COLRUYT", "Colruyt"), ("MONOPRIX", "Monoprix"), ("LUXCADDY", "Luxcaddy")]
+
+LANGS = list(WORDS)
+
+def product(i, seed):
+    """Produto i: (uid, ean, nome, marca, qtd). Determinístico por (seed, i) → as ofertas
+    voltam a gerá-lo pelo índice em vez de guardar os N/4 produtos numa lista."""
+    rnd = random.Random(seed * 1_000_003 + i)
+    name = f"{rnd.choice(WORDS[rnd.choice(LANGS)]).capitalize()} {rnd.choice(ADJ)} {i}"
+    brand, qty = rnd.choice(BRANDS), rnd.choice(QTY)
+    ean = f"{rnd.randrange(10**12, 10**13)}" if rnd.random() < 0.4 else ""
+    return (ean or slugify(name, brand, qty)), ean, name, brand, qty
+
+def produto_row(p, fonte, rnd):
+    uid, ean, name, brand, qty = p
+    return {"UID": uid, "EAN": ean, "Nome": name, "Marca": brand, "Rayon": "", "SousRayon": "",
+            "Tamanho": qty, "Imagem": f"https://img.example.lu/{uid[:2]}/{uid}.jpg?itok={rnd.randrange(1 << 20):x}",
+            "Fonte": fonte, "ScoreInicial": 5.0}
+
+def generate(root, rows, seed=42):
+    rnd = random.Random(seed)
+    out = Path(root) / "out"; out.mkdir(parents=True, exist_ok=True)
+    n_prim, n_off = max(1, rows // 4), max(1, rows // 2)
+    shared = int(n_off * 0.3)                     # UIDs do OFF que também vêm das lojas
+    day0 = datetime.date(2025, 1, 1)
+
+    # produtos 0..n_prim-1 = lojas; n_prim.. = só no OFF
+    with open(out / "produtos_primary.csv", "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=COLS_PRODUTOS); w.writeheader()
+        for i in range(n_prim):
+            p = product(i, seed)
+            code = rnd.choice(STORES)[0]
+            w.writerow(produto_row(p, code, rnd))
+            if rnd.random() < 0.05: w.writerow(produto_row(p, rnd.choice(STORES)[0], rnd))   # duplicado
+
+    with open(out / "produtos_off.csv", "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=COLS_OFF); w.writeheader()
+        for i in range(n_off - shared):
+            p = product(n_prim + i, seed)
+            w.writerow({**produto_row(p, "OFF", rnd), "OFFPrice": round(rnd.uniform(0.5, 30), 2) if i % 3 else ""})
+        # ~shared produtos das lojas, escolhidos numa passagem (sem rnd.sample sobre uma lista)
+        frac = min(1.0, shared / n_prim)
+        for i in range(n_prim):
+            if rnd.random() >= frac: continue
+            p = product(i, seed)
+            r = produto_row(p, "OFF", rnd)
+            if not p[1] and rnd.random() < 0.5: r["EAN"] = f"{rnd.randrange(10**12, 10**13)}"  # OFF completa o EAN
+            w.writerow({**r, "OFFPrice": round(rnd.uniform(0.5, 30), 2)})
+
+    with open(out / "ofertas_full.csv", "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=COLS_OFERTAS); w.writeheader()
+        for i in range(rows):
+            uid, ean, name, brand, qty = product(rnd.randrange(n_prim), seed)
+            code, loja = rnd.choice(STORES)
+            price = round(rnd.uniform(0.3, 40), 2)
+            promo = rnd.random() < 0.15
+            day = day0 + datetime.timedelta(days=rnd.randrange(90))
+            w.writerow({
+                "ProductUID": uid, "EAN": ean, "NomeProduto": name, "Loja": loja, "Store": code, "Country": "LU",
+                "Preco": price, "Moeda": "EUR", "PrecoUnidade": "", "Unidade": "",
+                "IsPromo": "TRUE" if promo else "FALSE", "ValidadeDe": "", "ValidadeAte": "",
+                "SourceURL": f"https://www.{code.lower()}.lu/p/{uid}", "SourceType": "folheto" if promo else "categoria",
+                "FetchedAt": f"{day.isoformat()}T06:00:00Z",
+            })
+    return {"ofertas_full": rows, "produtos_primary": n_prim, "produtos_off": n_off}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("dir")
+    ap.add_argument("--size", choices=SIZES, default="10k")
+    ap.add_argument("--rows", type=int, help="nº de linhas de ofertas (sobrepõe --size)")
+    ap.add_argument("--seed", type=int, default=42)
+    a = ap.parse_args()
+    n = generate(a.dir, a.rows or SIZES[a.size], a.seed)
+    print(f"✅ dados sintéticos em {a.dir}/out: {n}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Benchmark de escala dos estágios de pós-processamento (catálogo/ofertas).
+
+Uso: python bench/run_bench.py [--sizes 10k,1m] [--data DIR] [--stages merge_offers,build_catalog]
+
+Para cada tamanho gera dados sintéticos (bench/gen_data.py) numa pasta temporária (ou em
+--data, reutilizada se já existir) e corre cada estágio num subprocesso com cwd nessa pasta:
+  build_products_from_stores.py  build_catalog.py  merge_offers.py  utils.slugify
+Mede o tempo e o pico de memória (ru_maxrss do filho) e grava bench/results/<data>_<tamanho>.json.
+Compara com o resultado anterior do mesmo tamanho e marca regressões (> REGRESSION_PCT).
+"""
+import os, sys, json, time, shutil, platform, argparse, tempfile, datetime, subprocess
+from pathlib import Path
+
+ROOT    = Path(__file__).resolve().parent.parent
+RESULTS = ROOT / "bench" / "results"
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "bench"))
+import gen_data
+
+REGRESSION_PCT = float(os.getenv("BENCH_REGRESSION_PCT", "20"))
+MIN_DELTA      = {"secs": 0.05, "peak_mb": 5.0}   # abaixo disto é ruído (sobretudo no 10k)
+
+# slugify sozinho: lê os nomes primeiro e só cronometra o loop (o resultado vai no stdout)
+SLUGIFY = f"""
+import sys, csv, json, time
+sys.path.insert(0, {str(ROOT)!r})
+from utils import slugify
+with open("out/produtos_off.csv", encoding="utf-8") as f:
+    rows = [(r["Nome"], r["Marca"], r["Tamanho"]) for r in csv.DictReader(f)]
+t0 = time.perf_counter()
+for n, b, q in rows: slugify(n, b, q)
+print(json.dumps({{"inner_s": round(time.perf_counter() - t0, 3), "calls": len(rows)}}))
+"""
+
+STAGES = {
+    "build_products_from_stores": [str(ROOT / "build_products_from_stores.py")],
+    "build_catalog":              [str(ROOT / "build_catalog.py")],
+    "merge_offers":               [str(ROOT / "merge_offers.py")],
+    "slugify":                    ["-c", SLUGIFY],
+}
+
+def run_stage(args, cwd):
+    """Corre `python args` em cwd → (segundos, pico RSS em MB, stdout)."""
+    t0 = time.perf_counter()
+    p = subprocess.Popen([sys.executable, *args], cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    out = p.stdout.read()
+    _, status, ru = os.wait4(p.pid, 0)
+    secs = time.perf_counter() - t0
+    p.returncode = os.waitstatus_to_exitcode(status)
+    if p.returncode != 0:
+        raise RuntimeError(f"falhou ({p.returncode}): {out[-500:]}")
+    return secs, ru.ru_maxrss / 1024, out   # Linux: ru_maxrss em KB
+
+def git_rev():
+    try: return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception: return ""
+
+def previous(size):
+    prev = sorted(RESULTS.glob(f"*_{size}.json"))
+    if not prev: return None
+    return json.loads(prev[-1].read_text(encoding="utf-8"))
+
+def bench_size(size, data_dir, stages):
+    root = Path(data_dir) / size
+    if not (root / "out" / "ofertas_full.csv").exists():
+        t0 = time.perf_counter()
+        rows = gen_data.generate(root, gen_data.SIZES[size])
+        print(f"[{size}] dados gerados em {time.perf_counter()-t0:.1f}s: {rows}")
+    inputs = {p.stem: p.stat().st_size for p in (root / "out").glob("*.csv")
+              if p.stem in ("ofertas_full", "produtos_primary", "produtos_off")}
+
+    res = {}
+    for name in stages:
+        secs, mb, out = run_stage(STAGES[name], root)
+        r = {"secs": round(secs, 3), "peak_mb": round(mb, 1)}
+        if name == "slugify": r.update(json.loads(out.strip().splitlines()[-1]))
+        res[name] = r
+        print(f"[{size}] {name:<28} {secs:>8.2f}s {mb:>9.0f} MB")
+    return {"size": size, "rows": gen_data.SIZES[size], "input_bytes": inputs, "stages": res}
+
+def compare(cur, prev):
+    if not prev: return []
+    out = []
+    for name, r in cur["stages"].items():
+        p = prev["stages"].get(name)
+        if not p: continue
+        for k in ("secs", "peak_mb"):
+            if p[k] and r[k] - p[k] > MIN_DELTA[k] and (r[k] - p[k]) / p[k] * 100 > REGRESSION_PCT:
+                out.append(f"{name}.{k}: {p[k]} → {r[k]} (+{(r[k]-p[k])/p[k]*100:.0f}%)")
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10k", help="lista de " + "|".join(gen_data.SIZES))
+    ap.add_argument("--data", help="pasta para os dados gerados (reutilizada entre runs); default: temporária")
+    ap.add_argument("--stages", default=",".join(STAGES))
+    a = ap.parse_args()
+    sizes, stages = a.sizes.split(","), a.stages.split(",")
+    for s in stages:
+        if s not in STAGES: ap.error(f"estágio desconhecido: {s}")
+
+    tmp = None if a.data else tempfile.mkdtemp(prefix="easycheck-bench-")
+    try:
+        RESULTS.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        for size in sizes:
+            cur = bench_size(size, a.data or tmp, stages)
+            cur.update({"run": stamp, "git": git_rev(), "python": platform.python_version(),
+                        "cpus": os.cpu_count(), "machine": platform.machine()})
+            prev = previous(size)
+            regs = compare(cur, prev)
+            path = RESULTS / f"{stamp}_{size}.json"
+            path.write_text(json.dumps(cur, indent=1), encoding="utf-8")
+            for r in regs: print(f"⚠️ [{size}] regressão vs {prev['run']} ({prev['git']}): {r}")
+            print(f"✅ {path.relative_to(ROOT)}")
+    finally:
+        if tmp: shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
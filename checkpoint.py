@@ -0,0 +1,62 @@
+import os, csv, json
+from pathlib import Path
+
+# Escrita à prova de crash para runs longos:
+#  - PartWriter: cada fonte escreve para <parcial>.part e só no fim faz rename para .csv
+#  - RunJournal: journal append-only (JSONL, fsync) das fontes (loja, url) já concluídas;
+#    com --resume, as fontes no journal com parcial presente são saltadas.
+
+class PartWriter:
+    def __init__(self, path, cols):
+        self.path = Path(path)
+        self.tmp = self.path.with_name(self.path.name + ".part")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.f = self.tmp.open("w", newline="", encoding="utf-8")
+        self.w = csv.DictWriter(self.f, fieldnames=cols, extrasaction="ignore")
+        self.w.writeheader()
+        self.rows = 0
+
+    def write(self, rows):
+        for r in rows:
+            self.w.writerow(r); self.rows += 1
+        self.f.flush()
+
+    def close(self):
+        self.f.flush(); os.fsync(self.f.fileno()); self.f.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        self.f.close()
+        try: self.tmp.unlink()
+        except FileNotFoundError: pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None: self.close()
+        else: self.abort()
+
+class RunJournal:
+    def __init__(self, parts_dir, tag="", resume=False):
+        self.path = Path(parts_dir) / f"journal{tag}.jsonl"
+        self.done = {}
+        if resume and self.path.exists():
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    try: rec = json.loads(line)
+                    except ValueError: continue  # última linha cortada por um crash
+                    self.done[rec["key"]] = rec
+        elif self.path.exists():
+            self.path.unlink()
+
+    def is_done(self, key: str, *parts) -> bool:
+        return key in self.done and all(Path(p).exists() for p in parts)
+
+    def commit(self, key: str, **info):
+        rec = {"key": key, **info}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            f.flush(); os.fsync(f.fileno())
+        self.done[key] = rec
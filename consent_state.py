@@ -0,0 +1,85 @@
+import os, json, time, datetime, threading
+from pathlib import Path
+from urllib.parse import urlparse
+
+# Estado de consentimento (cookies/localStorage) guardado por domínio como storage state
+# do Playwright. Contextos novos carregam-no e só correm a rotina de cookies quando não
+# há estado, quando expirou (CONSENT_TTL_DAYS) ou quando o banner volta a aparecer.
+
+STATE_DIR = Path(os.getenv("CONSENT_STATE_DIR", "out/state"))
+TTL_DAYS  = float(os.getenv("CONSENT_TTL_DAYS", "7"))
+
+# banners conhecidos; se algum estiver visível com o estado carregado → estado caducou
+BANNER_SEL = ("#onetrust-banner-sdk, #didomi-popup, #CybotCookiebotDialog, "
+              ".cookie-banner, [id*='cookie-banner'], [class*='cookie-consent']")
+
+def domain_of(url: str) -> str:
+    h = urlparse(url).netloc.lower()
+    return h[4:] if h.startswith("www.") else h
+
+class ConsentStore:
+    def __init__(self, state_dir=STATE_DIR, ttl_days=TTL_DAYS):
+        self.state_dir = Path(state_dir)
+        self.meta_path = self.state_dir / "consent.json"
+        self.ttl_s = ttl_days * 86400
+        self.meta = {}
+        if self.meta_path.exists():
+            try: self.meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            except ValueError: self.meta = {}
+        self.runs = {}    # domínio → nº de rotinas de cookies neste run
+        self.skips = {}   # domínio → nº de páginas que a saltaram
+        self.lock = threading.RLock()   # threads de fetch; saved() chama flush() com o lock
+
+    def path(self, url: str) -> Path:
+        return self.state_dir / f"{domain_of(url)}.json"
+
+    def state_for(self, url: str) -> str | None:
+        """Caminho do storage state válido para o domínio, ou None."""
+        d = domain_of(url); p = self.path(url)
+        with self.lock: saved = self.meta.get(d, {}).get("saved_at", 0)
+        if p.exists() and time.time() - saved < self.ttl_s:
+            return str(p)
+        return None
+
+    def ran(self, url: str, secs: float):
+        # média móvel do custo da rotina → estimativa do que se poupa quando é saltada
+        d = domain_of(url)
+        with self.lock:
+            m = self.meta.setdefault(d, {})
+            m["consent_s"] = round(secs if "consent_s" not in m else 0.7 * m["consent_s"] + 0.3 * secs, 2)
+            self.runs[d] = self.runs.get(d, 0) + 1
+
+    def skipped(self, url: str):
+        d = domain_of(url)
+        with self.lock: self.skips[d] = self.skips.get(d, 0) + 1
+
+    def saved(self, url: str):
+        with self.lock:
+            self.meta.setdefault(domain_of(url), {})["saved_at"] = time.time()
+            self.flush()
+
+    def expire(self, url: str):
+        with self.lock: self.meta.get(domain_of(url), {}).pop("saved_at", None)
+
+    def flush(self):
+        # um só escritor de consent.tmp de cada vez (e o meta não muda durante o dump)
+        with self.lock:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.meta_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.meta, indent=1, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self.meta_path)
+
+    def report(self):
+        total = 0.0
+        for d in sorted(set(self.runs) | set(self.skips)):
+            per = self.meta.get(d, {}).get("consent_s", 0.0)
+            saved = self.skips.get(d, 0) * per
+            total += saved
+            when = self.meta.get(d, {}).get("saved_at")
+            when = datetime.datetime.fromtimestamp(when, datetime.timezone.utc).strftime("%Y-%m-%d") if when else "-"
+            print(f"[consent] {d} rotina={self.runs.get(d,0)}x (~{per:.1f}s/página) "
+                  f"saltada={self.skips.get(d,0)}x poupado≈{saved:.1f}s estado={when}")
+        if self.runs or self.skips:
+            print(f"[consent] total poupado ≈ {total:.1f}s")
+
+CONSENT = ConsentStore()
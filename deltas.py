@@ -0,0 +1,168 @@
+import os, csv, json, hashlib, argparse, datetime
+from pathlib import Path
+
+# Diferenças run-a-run do snapshot de ofertas: produto novo/removido, preço subiu/desceu (%),
+# preco_novo/sem_preco (o preço apareceu/desapareceu, sem %), promo começou/acabou. Uma passagem linear pelo snapshot novo contra o estado anterior
+# (chave = hash de ProductUID+Loja → preço, promo).
+#   python deltas.py                      (depois do merge_offers.py)
+#   python deltas.py since <run_id>       (JSONL de todos os deltas depois desse run)
+#   python deltas.py runs                 (lista o índice)
+
+IN_SNAP    = Path("out/ofertas_snapshot.csv")
+OUT_DELTAS = Path("out/deltas.csv")
+DELTAS_DIR = Path("out/deltas")
+STATE      = DELTAS_DIR / "state.csv"
+INDEX      = DELTAS_DIR / "index.json"
+KEEP_RUNS  = int(os.getenv("DELTAS_KEEP_RUNS", "90"))
+
+COLS       = ["RunId","Tipo","ProductUID","Loja","NomeProduto","PrecoAntes","PrecoDepois","VariacaoPct","FetchedAt"]
+STATE_COLS = ["Key","ProductUID","Loja","Preco","IsPromo"]
+
+def key_of(uid: str, loja: str) -> str:
+    return hashlib.blake2b(f"{uid}|{loja}".encode("utf-8"), digest_size=8).hexdigest()
+
+def to_price(v):
+    try: return float(str(v).replace(",","."))
+    except (TypeError, ValueError): return None
+
+def new_run_id() -> str:
+    # ordenável como string → since() é uma comparação simples
+    return datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+
+def load_state(path=STATE):
+    """{key: (preco, promo)} do run anterior. uid/loja não ficam em memória:
+    os removidos são lidos do ficheiro de estado no fim."""
+    if not path.exists(): return None
+    prev = {}
+    with path.open("r", encoding="utf-8") as f:
+        rd = csv.reader(f); next(rd, None)
+        for k, _, _, p, promo in rd:
+            prev[k] = (to_price(p), promo == "TRUE")
+    return prev
+
+def diff(snap_path, prev, run_id, state_out):
+    """Compara o snapshot com o estado anterior; devolve a lista de deltas.
+    Escreve o estado novo em `state_out` durante a mesma passagem."""
+    out = []
+    with open(snap_path, "r", encoding="utf-8") as f, \
+         open(state_out, "w", newline="", encoding="utf-8") as fs:
+        ws = csv.writer(fs); ws.writerow(STATE_COLS)
+        rd = csv.reader(f)
+        # csv.reader + índices (e não DictReader): é o loop quente em snapshots de 1M linhas
+        hdr = {c: i for i, c in enumerate(next(rd, []))}
+        iu, il, ip, ipr = hdr["ProductUID"], hdr["Loja"], hdr["Preco"], hdr["IsPromo"]
+        inome, ifet = hdr.get("NomeProduto"), hdr.get("FetchedAt")
+        for r in rd:
+            uid, loja = r[iu], r[il]
+            if not uid or not loja: continue
+            k = key_of(uid, loja)
+            p, promo = to_price(r[ip]), r[ipr].upper() == "TRUE"
+            ws.writerow((k, uid, loja, r[ip], "TRUE" if promo else "FALSE"))  # preço como veio: float→str é caro
+            if prev is None: continue
+            old = prev.pop(k, None)
+            if old is not None and old == (p, promo): continue
+            base = {"RunId": run_id, "ProductUID": uid, "Loja": loja,
+                    "NomeProduto": r[inome] if inome is not None else "",
+                    "FetchedAt": r[ifet] if ifet is not None else ""}
+            if old is None:
+                out.append({**base, "Tipo": "novo", "PrecoDepois": "" if p is None else p})
+                continue
+            op, opromo = old
+            had, has = bool(op and op > 0), bool(p and p > 0)   # vazio/0 = sem preço
+            if had and has and p != op:
+                out.append({**base, "Tipo": "subiu" if p > op else "desceu", "PrecoAntes": op,
+                            "PrecoDepois": p, "VariacaoPct": round((p - op) / op * 100, 1)})
+            elif has and not had:
+                out.append({**base, "Tipo": "preco_novo", "PrecoAntes": "" if op is None else op, "PrecoDepois": p})
+            elif had and not has:
+                out.append({**base, "Tipo": "sem_preco", "PrecoAntes": op, "PrecoDepois": "" if p is None else p})
+            if promo != opromo:
+                out.append({**base, "Tipo": "promo_inicio" if promo else "promo_fim",
+                            "PrecoAntes": "" if op is None else op, "PrecoDepois": "" if p is None else p})
+    return out
+
+def removed(prev, run_id, path=STATE):
+    # o que sobrou em `prev` não apareceu no snapshot novo
+    if not prev: return []
+    out = []
+    with path.open("r", encoding="utf-8") as f:
+        rd = csv.reader(f); next(rd, None)
+        for k, uid, loja, p, _ in rd:
+            if k in prev:
+                op = to_price(p)   # o estado guarda o preço como veio; nos deltas é float como nos outros tipos
+                out.append({"RunId": run_id, "Tipo": "removido", "ProductUID": uid,
+                            "Loja": loja, "PrecoAntes": "" if op is None else op})
+    return out
+
+def load_index(path=INDEX):
+    if not path.exists(): return []
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f).get("runs", [])
+
+def save_index(runs, path=INDEX):
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump({"runs": runs}, f, indent=1)
+    os.replace(tmp, path)
+
+def since(run_id: str, deltas_dir=DELTAS_DIR):
+    """Deltas de todos os runs depois de `run_id` (por ordem), lidos só dos JSONL precisos."""
+    for e in load_index(deltas_dir / "index.json"):
+        if e["run"] <= run_id or not e.get("file"): continue
+        with (deltas_dir / e["file"]).open("r", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+def run(snap_path=IN_SNAP, deltas_dir=DELTAS_DIR, out_csv=OUT_DELTAS, run_id=None):
+    run_id = run_id or new_run_id()
+    deltas_dir.mkdir(parents=True, exist_ok=True)
+    state = deltas_dir / "state.csv"
+    prev = load_state(state)
+    tmp = state.with_suffix(".tmp")
+    deltas = diff(snap_path, prev, run_id, tmp)
+    deltas += removed(prev, run_id, state)
+    os.replace(tmp, state)
+
+    counts = {}
+    for d in deltas: counts[d["Tipo"]] = counts.get(d["Tipo"], 0) + 1
+    entry = {"run": run_id, "n": len(deltas), "counts": counts}
+    if prev is None:
+        entry["baseline"] = True   # primeiro run: só grava o estado
+    else:
+        entry["file"] = f"{run_id}.jsonl"
+        with (deltas_dir / entry["file"]).open("w", encoding="utf-8") as f:
+            for d in deltas: f.write(json.dumps(d, ensure_ascii=False) + "\n")
+
+    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=COLS); w.writeheader()
+        for d in deltas: w.writerow(d)
+
+    runs = load_index(deltas_dir / "index.json") + [entry]
+    for old in runs[:-KEEP_RUNS]:
+        if old.get("file"):
+            try: (deltas_dir / old["file"]).unlink()
+            except FileNotFoundError: pass
+    save_index(runs[-KEEP_RUNS:], deltas_dir / "index.json")
+    return entry
+
+def main():
+    ap = argparse.ArgumentParser(description="Deltas run-a-run do snapshot de ofertas")
+    sub = ap.add_subparsers(dest="cmd")
+    s = sub.add_parser("since"); s.add_argument("run_id")
+    sub.add_parser("runs")
+    a = ap.parse_args()
+    if a.cmd == "since":
+        for d in since(a.run_id):
+            print(json.dumps(d, ensure_ascii=False))
+    elif a.cmd == "runs":
+        for e in load_index():
+            print(e["run"], e["n"], e["counts"])
+    else:
+        e = run()
+        if e.get("baseline"):
+            print(f"✅ deltas: estado inicial gravado (run {e['run']})")
+        else:
+            print(f"✅ deltas.csv: {e['n']} {e['counts']} (run {e['run']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import os, json, random
+from pathlib import Path
+from utils import now_iso
+
+# Política de diagnóstico: screenshot + HTML só quando vale a pena.
+#   - erro na página
+#   - zero itens, ou bem menos que o histórico da fonte (DIAG_ANOMALY_RATIO × média)
+#   - amostra aleatória (DIAG_SAMPLE_RATE, ex.: 0.05 = 5% das páginas)
+# Captura só o viewport, em JPEG (DIAG_QUALITY). O Playwright só gera PNG/JPEG, por isso não há WebP.
+#   DIAG_MODE=policy (default) | always | off
+
+DIAG_MODE         = os.getenv("DIAG_MODE", "policy").lower()
+DIAG_SAMPLE_RATE  = float(os.getenv("DIAG_SAMPLE_RATE", "0"))
+DIAG_ANOMALY_RATIO= float(os.getenv("DIAG_ANOMALY_RATIO", "0.3"))
+DIAG_QUALITY      = int(os.getenv("DIAG_QUALITY", "60"))
+DIAG_FULL_PAGE    = os.getenv("DIAG_FULL_PAGE", "") == "1"
+
+class DiagPolicy:
+    def __init__(self, debug_dir="out/debug", mode=DIAG_MODE, sample_rate=DIAG_SAMPLE_RATE,
+                 anomaly_ratio=DIAG_ANOMALY_RATIO):
+        self.debug_dir = Path(debug_dir)
+        self.history_path = self.debug_dir / "item_counts.json"
+        self.log_path = self.debug_dir / "diagnostics.jsonl"
+        self.mode, self.sample_rate, self.anomaly_ratio = mode, sample_rate, anomaly_ratio
+        self.history = {}
+        if self.history_path.exists():
+            try: self.history = json.loads(self.history_path.read_text(encoding="utf-8"))
+            except ValueError: self.history = {}
+        self.pages = 0
+        self.captures = []   # (motivo, segundos, bytes)
+
+    def reason(self, key: str, n_items: int, error=None) -> str | None:
+        """Motivo para capturar esta página, ou None."""
+        self.pages += 1
+        if self.mode == "off": return None
+        if self.mode == "always": return "always"
+        if error is not None: return "erro"
+        if n_items == 0: return "zero"
+        avg = self.history.get(key)
+        if avg and n_items < self.anomaly_ratio * avg:
+            return f"anómalo ({n_items} vs média {avg:.0f})"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "amostra"
+        return None
+
+    def observe(self, key: str, n_items: int):
+        # média móvel do nº de itens por fonte (só páginas sem erro)
+        prev = self.history.get(key)
+        self.history[key] = round(n_items if prev is None else 0.7 * prev + 0.3 * n_items, 1)
+
+    def record(self, reason: str, secs: float, nbytes: int):
+        self.captures.append((reason, secs, nbytes))
+
+    def report(self):
+        secs = sum(c[1] for c in self.captures); nbytes = sum(c[2] for c in self.captures)
+        reasons = {}
+        for r, _, _ in self.captures:
+            r = r.split(" ")[0]; reasons[r] = reasons.get(r, 0) + 1
+        print(f"[diag] {len(self.captures)}/{self.pages} páginas capturadas, "
+              f"{secs:.1f}s, {nbytes/1024:.0f} KB {reasons or ''}")
+        self.debug_dir.mkdir(parents=True, exist_ok=True)
+        self.history_path.write_text(json.dumps(self.history, indent=1, sort_keys=True), encoding="utf-8")
+        with self.log_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps({"run": now_iso(), "pages": self.pages, "captures": len(self.captures),
+                                "secs": round(secs, 2), "bytes": nbytes, "reasons": reasons}) + "\n")
+
+DIAG = DiagPolicy()
@@ -0,0 +1,176 @@
+import os, io, csv, json, hashlib, datetime, threading
+from pathlib import Path
+from ratelimit import LIMITER, polite_get
+from pipeline import Pipeline
+
+# Cache local das imagens do catálogo (produtos.csv → Imagem) com miniaturas WebP.
+#  - downloads em paralelo (threads + Session com pool, pelo limitador por host)
+#  - dedupe por URL e por conteúdo (sha256): o mesmo ficheiro sob URLs diferentes
+#    (ex.: Cactus ?itok=...) dá uma só miniatura
+#  - miniaturas de tamanho fixo (THUMB_SIZE², fundo branco) num pool de processos (PIL),
+#    guardadas por conteúdo: out/img/<tamanho>/<ab>/<sha>.webp
+#  - incremental: URLs já vistos só voltam a ser pedidos ao fim de IMG_RECHECK_DAYS,
+#    com If-None-Match / If-Modified-Since (304 → nada a fazer)
+# Saídas: out/img/index.json (URL → sha, ETag, Last-Modified) e
+#         out/produtos_thumbs.csv (UID → miniatura)
+#   IMG_WORKERS="16"  IMG_MAX_FETCH="5000" (por run)  THUMB_SIZE="256"  THUMB_QUALITY="80"
+
+IN_CATALOG    = Path("out/produtos.csv")
+IMG_DIR       = Path("out/img")
+OUT_THUMBS    = Path("out/produtos_thumbs.csv")
+IMG_WORKERS   = int(os.getenv("IMG_WORKERS", "16"))
+IMG_MAX_FETCH = int(os.getenv("IMG_MAX_FETCH", "5000"))
+IMG_MAX_BYTES = int(os.getenv("IMG_MAX_BYTES", str(8 * 1024 * 1024)))
+RECHECK_DAYS  = int(os.getenv("IMG_RECHECK_DAYS", "30"))
+THUMB_SIZE    = int(os.getenv("THUMB_SIZE", "256"))
+THUMB_QUALITY = int(os.getenv("THUMB_QUALITY", "80"))
+
+COLS = ["UID","Imagem","Thumb"]
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def session(workers=IMG_WORKERS):
+    with _sessions_lock:   # chamado pelas threads de fetch: uma só Session por pool
+        if workers not in _sessions:
+            import requests
+            from requests.adapters import HTTPAdapter
+            s = requests.Session()
+            s.headers.update({"User-Agent": "Mozilla/5.0 (compatible; easycheck-bot/1.0)", "Accept": "image/*"})
+            a = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+            s.mount("https://", a); s.mount("http://", a)
+            _sessions[workers] = s
+        return _sessions[workers]
+
+def thumb_rel(sha: str, size=THUMB_SIZE) -> str:
+    # relativo a IMG_DIR; o índice e o CSV não dependem de onde está a pasta
+    return f"{size}/{sha[:2]}/{sha}.webp"
+
+def load_index(img_dir=IMG_DIR):
+    p = img_dir / "index.json"
+    if not p.exists(): return {}
+    try: return json.loads(p.read_text(encoding="utf-8"))
+    except ValueError: return {}
+
+def save_index(index, img_dir=IMG_DIR):
+    img_dir.mkdir(parents=True, exist_ok=True)
+    tmp = img_dir / "index.tmp"
+    tmp.write_text(json.dumps(index, indent=0, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, img_dir / "index.json")
+
+def catalog_images(path=IN_CATALOG):
+    """[(UID, URL)] do catálogo, só URLs http(s)."""
+    if not path.exists(): return []
+    with path.open("r", encoding="utf-8") as f:
+        return [(r["UID"], r["Imagem"].strip()) for r in csv.DictReader(f)
+                if r.get("UID") and (r.get("Imagem") or "").strip().startswith(("http://", "https://"))]
+
+def cached(e, img_dir=IMG_DIR, size=THUMB_SIZE):
+    # miniatura no tamanho atual e no disco (THUMB_SIZE mudou → volta a ser "novo"; o gc apaga a antiga)
+    t = (e or {}).get("thumb", "")
+    return t.startswith(f"{size}/") and (img_dir / t).exists()
+
+def plan(urls, index, today, recheck_days=RECHECK_DAYS, img_dir=IMG_DIR, max_fetch=IMG_MAX_FETCH):
+    """URLs a pedir neste run: novos primeiro, depois os mais antigos por verificar."""
+    new, stale = [], []
+    for u in urls:
+        e = index.get(u)
+        if not cached(e, img_dir):
+            new.append(u)
+        elif (today - datetime.date.fromisoformat(e.get("checked", "2000-01-01"))).days >= recheck_days:
+            stale.append((e.get("checked", ""), u))
+    return (new + [u for _, u in sorted(stale)])[:max_fetch]
+
+def download(url, prev, img_dir=IMG_DIR, limiter=LIMITER, workers=IMG_WORKERS):
+    """Thread de fetch → argumentos de make_thumb. data=None quando não há nada a gerar."""
+    headers = {}
+    if cached(prev, img_dir):
+        if prev.get("etag"): headers["If-None-Match"] = prev["etag"]
+        if prev.get("modified"): headers["If-Modified-Since"] = prev["modified"]
+    r = polite_get(url, session=session(workers), timeout=20, headers=headers, limiter=limiter)
+    if r.status_code == 304:
+        return None, "", {**prev, "status": "304"}
+    if not r.headers.get("Content-Type", "image/").startswith("image/"):
+        raise ValueError(f"não é imagem ({r.headers.get('Content-Type')})")
+    data = r.content
+    if len(data) > IMG_MAX_BYTES:
+        raise ValueError(f"imagem grande demais ({len(data)} bytes)")
+    sha = hashlib.sha256(data).hexdigest()[:32]
+    meta = {"sha": sha, "thumb": thumb_rel(sha), "bytes": len(data), "status": "novo",
+            "etag": r.headers.get("ETag", ""), "modified": r.headers.get("Last-Modified", "")}
+    dest = img_dir / meta["thumb"]
+    if dest.exists():
+        return None, "", {**meta, "status": "dedupe"}   # mesmo conteúdo já tem miniatura
+    return data, str(dest), meta
+
+def make_thumb(data, dest, meta, size=THUMB_SIZE, quality=THUMB_QUALITY):
+    """Processo de parse: bytes → WebP size×size (proporções mantidas, fundo branco)."""
+    if data is None or os.path.exists(dest): return meta
+    from PIL import Image
+    im = Image.open(io.BytesIO(data))
+    im.draft("RGB", (size, size))   # JPEG: descodifica já reduzido
+    im = im.convert("RGBA")
+    im.thumbnail((size, size), Image.LANCZOS)
+    canvas = Image.new("RGB", (size, size), (255, 255, 255))
+    canvas.paste(im, ((size - im.width) // 2, (size - im.height) // 2), im)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = dest + ".tmp"
+    canvas.save(tmp, "WEBP", quality=quality, method=4)
+    os.replace(tmp, dest)   # duas URLs com o mesmo conteúdo ao mesmo tempo → mesmo ficheiro
+    return meta
+
+def gc(index, img_dir=IMG_DIR):
+    # miniaturas sem nenhum URL no índice (ex.: THUMB_SIZE mudou, produto saiu)
+    keep = {e["thumb"] for e in index.values() if e.get("thumb")}
+    n = 0
+    for p in img_dir.glob("*/*/*.webp"):
+        if str(p.relative_to(img_dir)) not in keep:
+            p.unlink(); n += 1
+    return n
+
+def refresh(catalog=IN_CATALOG, img_dir=IMG_DIR, out_csv=OUT_THUMBS, limiter=LIMITER,
+            workers=IMG_WORKERS, parse_workers=None, recheck_days=RECHECK_DAYS):
+    today = datetime.date.today()
+    pairs = catalog_images(catalog)
+    urls = list(dict.fromkeys(u for _, u in pairs))   # dedupe por URL, ordem do catálogo
+    if not urls:
+        # catálogo em falta/sem imagens (build falhou?) → não poda o índice nem apaga o cache
+        print(f"⚠️ [img] {catalog} sem URLs de imagem — cache e {out_csv.name} ficam como estão")
+        return {}
+    index = load_index(img_dir)
+    todo = plan(urls, index, today, recheck_days, img_dir)
+
+    stats = {"novo": 0, "dedupe": 0, "304": 0, "erro": 0}; nbytes = 0
+    pipe = Pipeline(lambda u: download(u, index.get(u), img_dir, limiter, workers), make_thumb,
+                    fetch_workers=workers, **({} if parse_workers is None else {"parse_workers": parse_workers}))
+    for url, meta, err, _ in pipe.run(todo):
+        if err is not None:
+            stats["erro"] += 1
+            if url in index: index[url]["checked"] = today.isoformat()   # tenta de novo daqui a RECHECK_DAYS
+            continue
+        stats[meta["status"]] += 1; nbytes += meta.get("bytes", 0) if meta["status"] != "304" else 0
+        index[url] = {k: v for k, v in meta.items() if k != "status"} | {"checked": today.isoformat()}
+        if sum(stats.values()) % 500 == 0: save_index(index, img_dir)   # um crash não perde tudo
+
+    live = set(urls)
+    index = {u: e for u, e in index.items() if u in live}
+    removed = gc(index, img_dir)
+    save_index(index, img_dir)
+
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with out_csv.open("w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=COLS); w.writeheader()
+        for uid, u in pairs:
+            e = index.get(u)
+            if e and e.get("thumb"):
+                w.writerow({"UID": uid, "Imagem": u, "Thumb": f"{img_dir.name}/{e['thumb']}"}); n += 1
+    pipe.report()
+    print(f"[img] pedidos={len(todo)} novas={stats['novo']} mesmo conteúdo={stats['dedupe']} "
+          f"304={stats['304']} erros={stats['erro']} {nbytes/1e6:.1f} MB | {len(urls) - len(todo)} URLs em cache "
+          f"| {removed} miniaturas órfãs removidas")
+    print(f"✅ {out_csv.name}: {n} produtos com miniatura")
+    return stats
+
+if __name__ == "__main__":
+    refresh()
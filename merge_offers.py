@@ -15,7 +15,7 @@ def read_csv(path):
 def write_csv(path, cols, rows):
     path.parent.mkdir(exist_ok=True)
     with path.open("w",newline="",encoding="utf-8") as f:
-        w=csv.DictWriter(f, fieldnames=cols); w.writeheader()
+        w=csv.DictWriter(f, fieldnames=cols, extrasaction="ignore"); w.writeheader()  # ofertas das lojas trazem EAN/Store/Country/SourceType
         for r in rows: w.writerow(r)
 
 def main():
@@ -0,0 +1,122 @@
+import os, time, queue, threading, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Pipeline fetch → parse → escrita com filas limitadas:
+#   FETCH_WORKERS threads de fetch (I/O: rede, browser) → fila `fetched`
+#   → ProcessPoolExecutor com PARSE_WORKERS processos (CPU: BeautifulSoup) → fila `parsed`
+#   → um único writer (a thread de quem chama run()).
+# As filas têm tamanho máximo (PIPE_QUEUE): se o parse ou a escrita atrasam, o fetch
+# bloqueia (backpressure) e nunca há mais do que umas dezenas de páginas em memória.
+#   FETCH_WORKERS="4"  PARSE_WORKERS="min(4, nº de cores)" (0 = parse numa thread, sem processos)  PIPE_QUEUE="8"
+# (num container, cpu_count() devolve os cores do host e não a quota → o default fica baixo)
+
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "4"))
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+PIPE_QUEUE    = int(os.getenv("PIPE_QUEUE", "8"))
+
+_END = object()
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+class Pipeline:
+    def __init__(self, fetch, parse, fetch_workers=FETCH_WORKERS, parse_workers=PARSE_WORKERS, qsize=PIPE_QUEUE):
+        """fetch(job) → tuplo de argumentos; parse(*args) → resultado.
+        `parse` corre noutro processo: tem de ser uma função de topo de módulo."""
+        self.fetch, self.parse = fetch, parse
+        self.n_fetch, self.n_parse, self.qsize = max(1, fetch_workers), max(0, parse_workers), max(1, qsize)
+        self.fetched, self.parsed = queue.Queue(self.qsize), queue.Queue(self.qsize)
+        self.busy = {"fetch": 0.0, "parse": 0.0, "write": 0.0}
+        self.depth = {"fetched": [0, 0], "parsed": [0, 0]}   # [soma, máx], amostrado por item escrito
+        self.items, self.wall = 0, 0.0
+        self.lock = threading.Lock()
+
+    def _add(self, stage, dt):
+        with self.lock: self.busy[stage] += dt
+
+    def _fetcher(self, todo):
+        while True:
+            try: job = todo.get_nowait()
+            except queue.Empty: break
+            try:
+                args, dt = timed(self.fetch, job); err = None
+            except Exception as e:
+                args, dt, err = None, 0.0, e
+            self._add("fetch", dt)
+            self.fetched.put((job, args, err, dt))   # bloqueia com a fila cheia
+        self.fetched.put(_END)
+
+    def _dispatcher(self, pool):
+        # no máx. 2 tarefas por processo em voo → o HTML não se acumula dentro do pool
+        n_slots = max(1, self.n_parse) * 2
+        slots = threading.Semaphore(n_slots)
+        ends = 0
+        while ends < self.n_fetch:
+            item = self.fetched.get()
+            if item is _END:
+                ends += 1; continue
+            job, args, err, fdt = item
+            if err is not None:
+                self.parsed.put((job, None, err, fdt)); continue
+            if pool is None:
+                try:
+                    res, dt = timed(self.parse, *args); e = None
+                except Exception as ex:
+                    res, dt, e = None, 0.0, ex
+                self._add("parse", dt)
+                self.parsed.put((job, res, e, fdt + dt)); continue
+            slots.acquire()
+            fut = pool.submit(timed, self.parse, *args)
+            fut.add_done_callback(lambda f, job=job, fdt=fdt: self._done(f, job, fdt, slots))
+        for _ in range(n_slots): slots.acquire()   # todas as callbacks já entregaram
+        self.parsed.put(_END)
+
+    def _done(self, fut, job, fdt, slots):
+        try:
+            (res, dt), err = fut.result(), None
+        except Exception as e:
+            res, dt, err = None, 0.0, e
+        self._add("parse", dt)
+        self.parsed.put((job, res, err, fdt + dt))
+        slots.release()
+
+    def _sample(self):
+        for name, q in (("fetched", self.fetched), ("parsed", self.parsed)):
+            d = self.depth[name]; n = q.qsize()
+            d[0] += n; d[1] = max(d[1], n)
+
+    def run(self, jobs):
+        """Gera (job, resultado, erro, segundos fetch+parse) pela ordem de conclusão."""
+        todo = queue.Queue()
+        for j in jobs: todo.put(j)
+        t0 = time.perf_counter()
+        # spawn (e não fork): o pool arranca com as threads de fetch já a correr
+        pool = ProcessPoolExecutor(self.n_parse, mp_context=multiprocessing.get_context("spawn")) \
+               if self.n_parse else None
+        threads = [threading.Thread(target=self._fetcher, args=(todo,), daemon=True) for _ in range(self.n_fetch)]
+        threads.append(threading.Thread(target=self._dispatcher, args=(pool,), daemon=True))
+        try:
+            for t in threads: t.start()
+            while True:
+                item = self.parsed.get()
+                if item is _END: break
+                self._sample(); self.items += 1
+                t1 = time.perf_counter()
+                yield item
+                self.busy["write"] += time.perf_counter() - t1
+        finally:
+            if pool: pool.shutdown(wait=False, cancel_futures=True)
+            self.wall = time.perf_counter() - t0
+
+    def report(self):
+        if not self.items: return
+        w = self.wall or 1e-9
+        util = lambda stage, n: 100 * self.busy[stage] / (w * max(1, n))
+        print(f"[pipeline] {self.items} itens em {w:.1f}s | fetch {self.n_fetch}× {util('fetch', self.n_fetch):.0f}% | "
+              f"parse {self.n_parse or 'thread'}× {util('parse', self.n_parse):.0f}% | escrita {util('write', 1):.0f}%")
+        fq, pq = self.depth["fetched"], self.depth["parsed"]
+        print(f"[pipeline] fila fetch→parse média {fq[0]/self.items:.1f} máx {fq[1]}/{self.qsize} | "
+              f"parse→escrita média {pq[0]/self.items:.1f} máx {pq[1]}/{self.qsize} "
+              f"(fetch→parse cheia = faltam processos de parse; vazia = faltam threads de fetch)")
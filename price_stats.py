@@ -0,0 +1,165 @@
+import os, csv, json, datetime
+from pathlib import Path
+import numpy as np
+
+IN_FULL    = Path("out/ofertas_full.csv")
+STATE      = Path("out/price_stats_state.json")
+OUT_STATS  = Path("out/price_stats.csv")
+
+# janela das estatísticas (últimos N dias) e janela do "preço mais baixo"
+# (pensadas para o run diário do run.sh; pares sem preço há KEEP_DAYS dias saem do CSV)
+STATS_DAYS  = int(os.getenv("PRICE_STATS_DAYS", "30"))
+LOWEST_DAYS = int(os.getenv("PRICE_LOWEST_DAYS", "90"))
+KEEP_DAYS   = max(STATS_DAYS, LOWEST_DAYS)
+
+COLS = ["ProductUID","Loja","Dias","Ultimo","UltimoDia","Min","Max","Mediana","Volatilidade",
+        "Min90d","IsLowest90d","AtualizadoEm"]
+
+def read_csv(path):
+    if not path.exists(): return []
+    with path.open("r",encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+def write_csv(path, cols, rows):
+    path.parent.mkdir(exist_ok=True)
+    with path.open("w",newline="",encoding="utf-8") as f:
+        w=csv.DictWriter(f, fieldnames=cols); w.writeheader()
+        for r in rows: w.writerow(r)
+
+def load_state(path=STATE):
+    # {loja: {uid: [[dia_ordinal, preco], ...]}} — só guarda os últimos KEEP_DAYS dias
+    if not path.exists(): return {}
+    with path.open("r",encoding="utf-8") as f:
+        return json.load(f).get("series", {})
+
+def save_state(series, path=STATE):
+    path.parent.mkdir(exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w",encoding="utf-8") as f:
+        json.dump({"keep_days": KEEP_DAYS, "series": series}, f, separators=(",",":"))
+    os.replace(tmp, path)
+
+def to_price(v):
+    try: return float(str(v).replace(",","."))
+    except (TypeError, ValueError): return None
+
+def to_day(v):
+    try: return datetime.date.fromisoformat(str(v)[:10]).toordinal()
+    except ValueError: return None
+
+def daily_prices(rows, default_day):
+    # preço do dia = mínimo visto nesse dia para (ProductUID, Loja)
+    out = {}
+    for r in rows:
+        uid, loja = r.get("ProductUID",""), r.get("Loja","")
+        p = to_price(r.get("Preco"))
+        if not uid or not loja or p is None or p <= 0: continue
+        d = to_day(r.get("FetchedAt","")) or default_day
+        k = (loja, uid, d)
+        if k not in out or p < out[k]: out[k] = p
+    return out
+
+def merge_run(series, daily, today):
+    """Junta os preços do run às séries e corta o que saiu da janela.
+    Devolve as chaves tocadas — só essas precisam de estatísticas novas."""
+    cutoff = today - KEEP_DAYS + 1
+    touched = set()
+    for (loja, uid, d), p in daily.items():
+        s = series.setdefault(loja, {}).setdefault(uid, [])
+        if s and s[-1][0] == d:
+            s[-1][1] = min(s[-1][1], p)
+        elif s and s[-1][0] > d:
+            # run atrasado: insere na posição certa
+            for i, (dd, pp) in enumerate(s):
+                if dd == d: s[i][1] = min(pp, p); break
+                if dd > d: s.insert(i, [d, p]); break
+        else:
+            s.append([d, p])
+        touched.add((loja, uid))
+    for loja, uid in touched:
+        s = series[loja][uid]
+        if s[0][0] < cutoff:
+            series[loja][uid] = [e for e in s if e[0] >= cutoff]
+    return touched
+
+def expire(series, today):
+    """Tira as séries cujo último preço já saiu de KEEP_DAYS (produto deixou de aparecer).
+    Devolve as chaves removidas — as linhas delas saem do price_stats.csv."""
+    cutoff = today - KEEP_DAYS + 1
+    gone = set()
+    for loja in list(series):
+        by_uid = series[loja]
+        for uid in [u for u, s in by_uid.items() if not s or s[-1][0] < cutoff]:
+            del by_uid[uid]; gone.add((loja, uid))
+        if not by_uid: del series[loja]
+    return gone
+
+def group_stats(keys, series, today):
+    """Estatísticas por grupo em NumPy: um único array de preços com o id do grupo."""
+    if not keys: return {}
+    lens = np.fromiter((len(series[l][u]) for l, u in keys), dtype=np.int64, count=len(keys))
+    flat = np.array([e for l, u in keys for e in series[l][u]], dtype=np.float64).reshape(-1, 2)
+    g = np.repeat(np.arange(len(keys)), lens)
+    d, p = flat[:, 0].astype(np.int64), flat[:, 1]
+    last = p[np.cumsum(lens) - 1]  # séries ordenadas por dia → último elemento = último preço
+
+    def windowed(days):
+        m = d >= today - days + 1
+        gw, pw = g[m], p[m]
+        ps = np.append(pw[np.lexsort((pw, gw))], np.nan)  # sentinela NaN p/ grupos vazios
+        n = np.bincount(gw, minlength=len(keys))
+        start = np.cumsum(n) - n
+        at = lambda i: ps[np.where(n > 0, i, len(ps) - 1)]
+        lo, hi = at(start), at(start + n - 1)
+        mid = (at(start + (n - 1)//2) + at(start + n//2)) / 2
+        safe_n = np.maximum(n, 1)
+        mean = np.bincount(gw, weights=pw, minlength=len(keys)) / safe_n
+        var  = np.bincount(gw, weights=pw*pw, minlength=len(keys)) / safe_n - mean**2
+        with np.errstate(invalid="ignore", divide="ignore"):
+            vol = np.where((n > 0) & (mean > 0), np.sqrt(np.maximum(var, 0)) / mean, np.nan)
+        return n, lo, hi, mid, vol
+
+    n, lo, hi, mid, vol = windowed(STATS_DAYS)
+    n90, lo90, _, _, _ = windowed(LOWEST_DAYS)
+    lowest = (n90 > 1) & (last <= lo90)
+
+    return {k: (int(n[i]), float(last[i]), float(lo[i]), float(hi[i]), float(mid[i]),
+                float(vol[i]), float(lo90[i]), bool(lowest[i]))
+            for i, k in enumerate(keys)}
+
+def fmt(v, nd=2):
+    return "" if v != v else round(v, nd)  # NaN → vazio
+
+def update_rows(stats, keys, series, today):
+    """Recalcula as linhas de `stats` das chaves dadas (in-place)."""
+    now = datetime.date.fromordinal(today).isoformat()
+    for (loja, uid), (n, last, lo, hi, mid, vol, lo90, lowest) in group_stats(sorted(keys), series, today).items():
+        stats[(loja, uid)] = {
+            "ProductUID": uid, "Loja": loja, "Dias": n, "Ultimo": fmt(last),
+            "UltimoDia": datetime.date.fromordinal(series[loja][uid][-1][0]).isoformat(),
+            "Min": fmt(lo), "Max": fmt(hi), "Mediana": fmt(mid), "Volatilidade": fmt(vol, 4),
+            "Min90d": fmt(lo90), "IsLowest90d": "TRUE" if lowest else "FALSE", "AtualizadoEm": now,
+        }
+
+def main():
+    rows = read_csv(IN_FULL)
+    today = datetime.date.today().toordinal()
+    daily = daily_prices(rows, today)
+    if daily: today = max(d for _, _, d in daily)
+
+    series = load_state()
+    touched = merge_run(series, daily, today)
+    gone = expire(series, today)
+    touched -= gone   # linhas do CSV mais velhas que KEEP_DAYS → série vazia, já removida
+
+    # só as chaves tocadas são recalculadas; o resto mantém a linha anterior (UltimoDia diz de quando é)
+    stats = {(r["Loja"], r["ProductUID"]): r for r in read_csv(OUT_STATS)}
+    for k in gone: stats.pop(k, None)
+    update_rows(stats, touched, series, today)
+
+    save_state(series)
+    write_csv(OUT_STATS, COLS, stats.values())
+    print(f"✅ price_stats.csv: {len(stats)} (atualizados {len(touched)}, expirados {len(gone)})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import os, time, asyncio, itertools
+from collections import deque
+from urllib.parse import urlparse
+
+# Pool de endpoints SOCKS (vários SOCKSPort do Tor = vários circuitos independentes).
+# Env:
+#   SOCKS_ENDPOINTS="socks5://127.0.0.1:9050,socks5://127.0.0.1:9052"  (lista completa)
+#   TOR_SOCKS_PORTS="9050,9052,9054"                                    (atalho p/ Tor local)
+#   PROXY_STRATEGY="least_loaded" | "round_robin"
+
+class Endpoint:
+    def __init__(self, server: str, window: int = 10):
+        self.server = server
+        self.in_use = 0
+        self.requests = 0
+        self.failures = 0
+        self.latency_ema = None       # segundos
+        self.recent = deque(maxlen=window)  # True/False dos últimos pedidos
+        self.evicted_until = 0.0
+        self.evictions = 0
+
+    @property
+    def host_port(self):
+        u = urlparse(self.server)
+        return u.hostname or "127.0.0.1", u.port or 1080
+
+    def failure_rate(self) -> float:
+        if not self.recent: return 0.0
+        return 1 - sum(self.recent) / len(self.recent)
+
+    def is_healthy(self, now=None) -> bool:
+        return (now or time.monotonic()) >= self.evicted_until
+
+    def stats(self) -> dict:
+        return {
+            "server": self.server,
+            "in_use": self.in_use,
+            "requests": self.requests,
+            "failures": self.failures,
+            "failure_rate": round(self.failure_rate(), 3),
+            "latency_s": round(self.latency_ema, 2) if self.latency_ema is not None else None,
+            "healthy": self.is_healthy(),
+            "evictions": self.evictions,
+        }
+
+class ProxyPool:
+    def __init__(self, servers, strategy="least_loaded", max_failure_rate=0.5,
+                 max_latency_s=90.0, min_samples=3, cooldown_s=300.0):
+        self.endpoints = [Endpoint(s) for s in servers]
+        self.strategy = strategy
+        self.max_failure_rate = max_failure_rate
+        self.max_latency_s = max_latency_s
+        self.min_samples = min_samples
+        self.cooldown_s = cooldown_s
+        self._rr = itertools.count()
+
+    @classmethod
+    def from_env(cls):
+        raw = os.getenv("SOCKS_ENDPOINTS", "")
+        servers = [s.strip() for s in raw.split(",") if s.strip()]
+        if not servers:
+            ports = [p.strip() for p in os.getenv("TOR_SOCKS_PORTS", "9050").split(",") if p.strip()]
+            servers = [f"socks5://127.0.0.1:{p}" for p in ports]
+        return cls(
+            servers,
+            strategy=os.getenv("PROXY_STRATEGY", "least_loaded"),
+            max_failure_rate=float(os.getenv("PROXY_MAX_FAILURE_RATE", "0.5")),
+            max_latency_s=float(os.getenv("PROXY_MAX_LATENCY", "90")),
+            cooldown_s=float(os.getenv("PROXY_COOLDOWN", "300")),
+        )
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    def healthy(self):
+        now = time.monotonic()
+        return [e for e in self.endpoints if e.is_healthy(now)]
+
+    def acquire(self) -> Endpoint:
+        """Escolhe um endpoint para um novo browser context.
+        Se todos estiverem afastados, usa o que volta mais cedo (nunca fica sem proxy)."""
+        pool = self.healthy() or [min(self.endpoints, key=lambda e: e.evicted_until)]
+        if self.strategy == "round_robin":
+            ep = pool[next(self._rr) % len(pool)]
+        else:
+            ep = min(pool, key=lambda e: (e.in_use, e.latency_ema or 0.0))
+        ep.in_use += 1
+        return ep
+
+    def release(self, ep: Endpoint, ok: bool, latency_s: float | None = None):
+        ep.in_use = max(0, ep.in_use - 1)
+        ep.requests += 1
+        ep.recent.append(bool(ok))
+        if not ok: ep.failures += 1
+        if latency_s is not None:
+            ep.latency_ema = latency_s if ep.latency_ema is None else 0.7 * ep.latency_ema + 0.3 * latency_s
+        self._maybe_evict(ep)
+
+    def _maybe_evict(self, ep: Endpoint):
+        if len(ep.recent) < self.min_samples: return
+        slow = ep.latency_ema is not None and ep.latency_ema > self.max_latency_s
+        if ep.failure_rate() > self.max_failure_rate or slow:
+            self.evict(ep, "lento" if slow else "falhas")
+
+    def evict(self, ep: Endpoint, reason: str = ""):
+        ep.evicted_until = time.monotonic() + self.cooldown_s
+        ep.evictions += 1
+        ep.recent.clear()  # ao voltar, começa do zero
+        print(f"[proxy] {ep.server} afastado {int(self.cooldown_s)}s ({reason})")
+
+    async def health_check(self, timeout_s: float = 5.0):
+        """Abre uma ligação TCP a cada porta SOCKS; as que não respondem ficam de fora."""
+        async def probe(ep: Endpoint):
+            host, port = ep.host_port
+            t0 = time.monotonic()
+            try:
+                _, w = await asyncio.wait_for(asyncio.open_connection(host, port), timeout_s)
+                w.close()
+                return ep, time.monotonic() - t0
+            except Exception:
+                return ep, None
+        for ep, lat in await asyncio.gather(*(probe(e) for e in self.endpoints)):
+            if lat is None: self.evict(ep, "health check")
+        return self.healthy()
+
+    def stats(self):
+        return [e.stats() for e in self.endpoints]
+
+    def report(self):
+        for s in self.stats():
+            lat = f"{s['latency_s']}s" if s["latency_s"] is not None else "-"
+            print(f"[proxy] {s['server']} pedidos={s['requests']} falhas={s['failures']} "
+                  f"taxa_falha={s['failure_rate']} latência={lat} afastamentos={s['evictions']}")
@@ -0,0 +1,162 @@
+import os, time, random, asyncio, threading
+from urllib.parse import urlparse
+
+# Limitador por host (token bucket) com taxa adaptativa + circuit breaker.
+#  - sucesso  → a taxa sobe devagar (aditivo) até max_rate
+#  - 403/429/5xx/timeout → a taxa cai para metade (multiplicativo) e respeita Retry-After
+#    (403 = bloqueio ativo, p.ex. saída Tor na lista negra: abrandar, não acelerar)
+#  - N falhas seguidas → circuito aberto: o host é saltado durante open_s
+# Env:
+#   RATE_DEFAULT="1.0"                      pedidos/s iniciais por host
+#   RATE_FOR="luxcaddy.lu=4;auchan.lu=0.3"  taxa inicial por domínio
+#   BREAKER_FAILURES="5"  BREAKER_OPEN_S="180"
+
+class CircuitOpen(Exception):
+    pass
+
+def throttled(status: int | None) -> bool:
+    """Respostas que abrandam o host: 403/429/5xx, ou None (timeout/erro de rede)."""
+    return status is None or status in (403, 429) or status >= 500
+
+def host_of(url: str) -> str:
+    try: return urlparse(url).netloc.lower()
+    except Exception: return ""
+
+def parse_rate_map(s: str):
+    m={}
+    for pair in s.split(";"):
+        if "=" in pair:
+            d,r = pair.split("=",1)
+            try: m[d.strip().lower()] = float(r)
+            except ValueError: pass
+    return m
+
+class HostState:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.not_before = 0.0      # Retry-After
+        self.fails = 0             # falhas consecutivas
+        self.open_until = 0.0
+        self.ok = 0
+        self.errors = 0
+        self.waited = 0.0
+
+class HostLimiter:
+    def __init__(self, default_rate=1.0, rates=None, min_rate=0.05, max_rate=8.0, burst=2.0,
+                 step=0.1, backoff=0.5, fail_threshold=5, open_s=180.0):
+        self.default_rate = default_rate
+        self.rates = rates or {}
+        self.min_rate, self.max_rate = min_rate, max_rate
+        self.burst, self.step, self.backoff = burst, step, backoff
+        self.fail_threshold, self.open_s = fail_threshold, open_s
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            default_rate=float(os.getenv("RATE_DEFAULT", "1.0")),
+            rates=parse_rate_map(os.getenv("RATE_FOR", "")),
+            fail_threshold=int(os.getenv("BREAKER_FAILURES", "5")),
+            open_s=float(os.getenv("BREAKER_OPEN_S", "180")),
+        )
+
+    def _state(self, host: str) -> HostState:
+        st = self.hosts.get(host)
+        if st is None:
+            rate = next((r for d, r in self.rates.items() if host.endswith(d)), self.default_rate)
+            st = self.hosts[host] = HostState(rate, self.burst)
+        return st
+
+    def reserve(self, url: str) -> float:
+        """Reserva um token para o host e devolve quantos segundos esperar."""
+        host = host_of(url)
+        with self.lock:
+            st = self._state(host)
+            now = time.monotonic()
+            if now < st.open_until:
+                raise CircuitOpen(f"{host}: circuito aberto por mais {int(st.open_until - now)}s")
+            st.tokens = min(st.burst, st.tokens + (now - st.last) * st.rate)
+            st.last = now
+            st.tokens -= 1
+            wait = max(0.0, -st.tokens / st.rate, st.not_before - now)
+            wait += random.random() * 0.1 * wait  # jitter p/ não sincronizar pedidos
+            st.waited += wait
+            return wait
+
+    def is_open(self, url: str) -> bool:
+        st = self.hosts.get(host_of(url))
+        return bool(st) and time.monotonic() < st.open_until
+
+    def wait(self, url: str):
+        d = self.reserve(url)
+        if d > 0: time.sleep(d)
+
+    async def wait_async(self, url: str):
+        d = self.reserve(url)
+        if d > 0: await asyncio.sleep(d)
+
+    def success(self, url: str):
+        with self.lock:
+            st = self._state(host_of(url))
+            st.ok += 1; st.fails = 0
+            st.rate = min(self.max_rate, st.rate + self.step)
+
+    def failure(self, url: str, retry_after: float | None = None):
+        host = host_of(url)
+        with self.lock:
+            st = self._state(host)
+            st.errors += 1; st.fails += 1
+            st.rate = max(self.min_rate, st.rate * self.backoff)
+            st.tokens = min(st.tokens, 0.0)
+            if retry_after:
+                st.not_before = max(st.not_before, time.monotonic() + retry_after)
+            if st.fails >= self.fail_threshold:
+                st.open_until = time.monotonic() + self.open_s
+                st.fails = self.fail_threshold - 1  # half-open: ao voltar, uma falha reabre logo
+                print(f"[rate] {host}: {self.fail_threshold} falhas seguidas → pausa {int(self.open_s)}s")
+
+    def record(self, url: str, status: int | None, retry_after: float | None = None):
+        """Classifica uma resposta: 403/429/5xx (ou None = timeout/erro de rede) abrandam o host."""
+        if throttled(status):
+            self.failure(url, retry_after)
+        else:
+            self.success(url)
+
+    def report(self):
+        for host, st in sorted(self.hosts.items()):
+            print(f"[rate] {host} ok={st.ok} erros={st.errors} taxa={st.rate:.2f}/s espera={st.waited:.1f}s")
+
+def retry_after_of(resp) -> float | None:
+    h = (resp.headers or {}) if resp is not None else {}
+    v = h.get("Retry-After") or h.get("retry-after")
+    try: return min(float(v), 300.0)
+    except (TypeError, ValueError): return None
+
+LIMITER = HostLimiter.from_env()
+
+def polite_request(method, url, tries=3, session=None, limiter=LIMITER, **kw):
+    """Pedido HTTP com limitador por host; repete só em 403/429/5xx/erros de rede."""
+    import requests
+    s = session or requests
+    last = None
+    for _ in range(tries):
+        limiter.wait(url)
+        try:
+            r = s.request(method, url, **kw)
+        except requests.RequestException as e:
+            limiter.failure(url); last = e
+            continue
+        if throttled(r.status_code):
+            limiter.failure(url, retry_after_of(r)); last = requests.HTTPError(f"{r.status_code} em {url}", response=r)
+            continue
+        limiter.success(url)
+        r.raise_for_status()
+        return r
+    raise last
+
+def polite_get(url, tries=3, session=None, limiter=LIMITER, **kw):
+    return polite_request("GET", url, tries=tries, session=session, limiter=limiter, **kw)
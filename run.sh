@@ -30,8 +30,21 @@ python build_catalog.py
 echo "==[ 4) Consolidar preços (estimativa + OFF fallback) ]=="
 python merge_offers.py
 
-echo "==[ 5) Commit & push CSVs ]=="
+echo "==[ 4b) Imagens do catálogo → miniaturas WebP (incremental) ]=="
+python image_cache.py || true
+
+echo "==[ 5) Estatísticas de preço (min/mediana/max, mínimo 90d) ]=="
+python price_stats.py || true
+
+echo "==[ 6) Deltas desde o run anterior (novos/removidos/preço/promo) ]=="
+python deltas.py || true
+
+echo "==[ 7) Commit & push CSVs ]=="
 git add out/*.csv || true
+git add out/price_stats_state.json || true
+git add out/fetch_strategy.json || true
+git add out/deltas || true
+git add out/img || true
 git add out/debug/*.html || true
 git commit -m "Render cron: update CSVs" || echo "nada a commitar"
 git pull --rebase origin "$(git rev-parse --abbrev-ref HEAD)" || true
@@ -1,13 +1,23 @@
-import os, csv, json, asyncio, re
+import os, json, asyncio, re, time, argparse
 from pathlib import Path
 from urllib.parse import urlparse, urljoin
 from playwright.async_api import async_playwright, Response
 from utils import slugify, is_debug, now_iso
+from proxy_pool import ProxyPool
+from ratelimit import LIMITER, retry_after_of
+import shards
+from consent_state import CONSENT, BANNER_SEL
+from diagnostics import DIAG, DIAG_QUALITY, DIAG_FULL_PAGE
+from checkpoint import RunJournal
+from api_replay import API, API_REPLAY, learn
 
 OUT_DIR = Path("out"); OUT_DIR.mkdir(parents=True, exist_ok=True)
 DEBUG_DIR = OUT_DIR / "debug"; DEBUG_DIR.mkdir(parents=True, exist_ok=True)
 SHOT_DIR = OUT_DIR / "shots"; SHOT_DIR.mkdir(parents=True, exist_ok=True)
 OFERTAS_FULL = OUT_DIR / "ofertas_full.csv"
+PARTS_DIR = OUT_DIR / "shards_monthly"  # parciais do --shard (python shards.py merge --dir out/shards_monthly)
+RUN_PARTS_DIR = OUT_DIR / "parts_monthly"  # parciais + journal do run em curso (--resume)
+COLS = ["ProductUID","NomeProduto","Loja","Preco","Moeda","PrecoUnidade","Unidade","IsPromo","ValidadeDe","ValidadeAte","SourceURL","FetchedAt"]
 
 # Categorias por loja (podes ampliar depois)
 CATEGORIES = {
@@ -39,6 +49,9 @@ CATEGORIES = {
 
 # Env: TOR e escolha de browser por domínio (para Auchan/Colruyt/Delhaize)
 USE_TOR_FOR = {d.strip().lower() for d in os.getenv("USE_TOR_FOR","").split(",") if d.strip()}
+# vários SOCKSPort do Tor → contextos em paralelo, cada um no seu circuito
+TOR_POOL = ProxyPool.from_env()
+TOR_CONCURRENCY = int(os.getenv("TOR_CONCURRENCY", "0")) or len(TOR_POOL)
 
 def parse_browser_map(s: str):
     m={}
@@ -105,6 +118,10 @@ def walk_json(obj, found):
     elif isinstance(obj, list):
         for it in obj: walk_json(it, found)
 
+def json_items(data):
+    found = []; walk_json(data, found)
+    return found
+
 async def scroll_to_bottom(page, step=1200, max_scrolls=60):
     last = 0
     for _ in range(max_scrolls):
@@ -127,6 +144,26 @@ async def load_more(page):
             await btn.click(); await page.wait_for_timeout(1500)
         except: break
 
+async def banner_visible(page):
+    try: return await page.locator(BANNER_SEL).first.is_visible()
+    except: return False
+
+async def ensure_consent(page, context, url: str, state):
+    """Storage state válido e sem banner → salta accept_cookies; senão corre-a e guarda o estado."""
+    if state and not await banner_visible(page):
+        CONSENT.skipped(url)
+        return
+    if state: CONSENT.expire(url)
+    t0 = time.monotonic()
+    await accept_cookies(page)
+    CONSENT.ran(url, time.monotonic() - t0)
+    if await banner_visible(page): return
+    try:
+        CONSENT.path(url).parent.mkdir(parents=True, exist_ok=True)
+        await context.storage_state(path=str(CONSENT.path(url)))
+        CONSENT.saved(url)
+    except: pass
+
 async def accept_cookies(page):
     # 1) na página principal
     selectors = [
@@ -150,6 +187,118 @@ async def accept_cookies(page):
                 except: pass
         except: pass
 
+async def goto(page, url: str, timeout: int):
+    # limitador por host partilhado com o scrape_stores (token bucket + circuit breaker)
+    await LIMITER.wait_async(url)
+    try:
+        resp = await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+    except Exception:
+        LIMITER.record(url, None)
+        raise
+    LIMITER.record(url, resp.status if resp else 200, retry_after_of(resp))
+    return resp
+
+# ─────────────────────────────────────────────────────────────
+# Extração de cartões no DOM. Os seletores vão para a página num único
+# page.evaluate e voltam todos os cartões num array JSON (1 round-trip por página,
+# em vez de 3 query_selector + 3 inner_text por cartão).
+#   DOM_EXTRACT=evaluate (default) | loop (por elemento, como antes) | compare (ambos, com tempos)
+# ─────────────────────────────────────────────────────────────
+DOM_EXTRACT = os.getenv("DOM_EXTRACT", "evaluate").lower()
+
+DOM_SELECTORS = {
+    "DEFAULT": {
+        "card":  ".product, .product-card, li.product-item, .product-grid__item, "
+                 "[data-test='product-tile'], .tile, .mod-article-tile",
+        "name":  ".product-title, .product-item-name, .product__title, .title, "
+                 "[data-test='product-title'], .mod-article-tile__title",
+        "price": ".price, .product-price, .product__price, .price__amount, "
+                 "[data-test='product-price'], .mod-article-tile__price, [class*='price']",
+        "size":  ".size, .product-size, .product__size, .subtitle, "
+                 "[data-test='product-subtitle'], .mod-article-tile__subtitle, [class*='size']",
+        "link":  "a[href]",
+        "image": "img",
+    },
+    # ALDI (SAP Commerce)
+    "ALDI": {
+        "card":  ".mod-article-tile, .product, .product-card, [data-test='product-tile']",
+        "name":  ".mod-article-tile__title, .product-title, .title, [data-test='product-title']",
+        "price": ".mod-article-tile__price, .price, [data-test='product-price'], [class*='price']",
+        "size":  ".mod-article-tile__subtitle, .subtitle, .product-size, [data-test='product-subtitle']",
+        "link":  "a[href]",
+        "image": "img",
+    },
+}
+
+EXTRACT_JS = """
+(cfg) => {
+  const q = (el, s) => { if (!s) return null; try { return el.querySelector(s); } catch (e) { return null; } };
+  const txt = (el) => el ? (el.innerText || "").trim() : "";
+  const out = [];
+  for (const c of document.querySelectorAll(cfg.card)) {
+    const a = q(c, cfg.link), img = q(c, cfg.image);
+    out.push({
+      name: txt(q(c, cfg.name)), price: txt(q(c, cfg.price)), size: txt(q(c, cfg.size)),
+      link: a ? a.href : "",
+      image: img ? (img.currentSrc || img.src || img.getAttribute("data-src") || "") : "",
+    });
+  }
+  return out;
+}
+"""
+
+DOM_TIMES = {"evaluate": [0.0, 0], "loop": [0.0, 0]}  # modo → [segundos, páginas]
+
+def dom_selectors(store: str) -> dict:
+    return DOM_SELECTORS.get(store, DOM_SELECTORS["DEFAULT"])
+
+def price_from_text(txt: str):
+    m = re.search(r"(\d+(?:[.,]\d{1,2}))", (txt or "").replace("\xa0"," ").replace(",","."))
+    if m:
+        try: return float(m.group(1))
+        except: return None
+    return None
+
+def cards_to_items(cards):
+    return [{"name": c["name"], "price": price_from_text(c["price"]), "size": c["size"],
+             "is_promo": False, "link": c.get("link",""), "image": c.get("image","")}
+            for c in cards if c.get("name")]
+
+async def cards_evaluate(page, cfg):
+    return await page.evaluate(EXTRACT_JS, cfg)
+
+async def cards_loop(page, cfg):
+    cards = []
+    for c in await page.query_selector_all(cfg["card"]):
+        name_el = await c.query_selector(cfg["name"])
+        price_el= await c.query_selector(cfg["price"])
+        size_el = await c.query_selector(cfg["size"])
+        cards.append({
+            "name": (await name_el.inner_text()).strip() if name_el else "",
+            "price": (await price_el.inner_text()).strip() if price_el else "",
+            "size": (await size_el.inner_text()).strip() if size_el else "",
+        })
+    return cards
+
+async def extract_cards(page, store: str, cfg: dict):
+    modes = {"compare": ["evaluate", "loop"], "loop": ["loop"]}.get(DOM_EXTRACT, ["evaluate"])
+    res = {}
+    for mode in modes:
+        t0 = time.perf_counter()
+        cards = await (cards_loop(page, cfg) if mode == "loop" else cards_evaluate(page, cfg))
+        dt = time.perf_counter() - t0
+        DOM_TIMES[mode][0] += dt; DOM_TIMES[mode][1] += 1
+        res[mode] = (cards, dt)
+    if DOM_EXTRACT == "compare":
+        (ce, te), (cl, tl) = res["evaluate"], res["loop"]
+        print(f"[{store}] DOM: evaluate {te*1000:.0f} ms vs loop {tl*1000:.0f} ms "
+              f"({len(ce)} cartões, {tl/te if te else 0:.1f}x)")
+    return cards_to_items(res[modes[0]][0])
+
+def dom_report():
+    for mode, (secs, pages) in DOM_TIMES.items():
+        if pages: print(f"[dom] {mode}: {pages} páginas, {secs*1000/pages:.0f} ms/página")
+
 async def parse_ld_json(page):
     items=[]
     for h in await page.query_selector_all("script[type='application/ld+json']"):
@@ -186,11 +335,9 @@ def host_of(url: str) -> str:
     try: return urlparse(url).netloc.lower()
     except: return ""
 
-def proxy_for(url: str):
+def uses_tor(url: str) -> bool:
     h = host_of(url)
-    for dom in USE_TOR_FOR:
-        if h.endswith(dom): return {"server": "socks5://127.0.0.1:9050"}
-    return None
+    return any(h.endswith(dom) for dom in USE_TOR_FOR)
 
 def browser_for(url: str):
     h = host_of(url)
@@ -199,6 +346,26 @@ def browser_for(url: str):
             return br  # "chromium" | "firefox" | "webkit"
     return "chromium"
 
+async def diagnose(page, store: str, url: str, n_items: int, error=None):
+    """Screenshot (viewport, JPEG) + HTML só quando a política de diagnóstico o pede."""
+    key = shards.source_key(store, url)
+    reason = DIAG.reason(key, n_items, error)
+    if error is None: DIAG.observe(key, n_items)
+    if not reason: return
+    t0 = time.monotonic(); nbytes = 0
+    try:
+        # o scroll/load_more deixa a página no fundo; o viewport deve mostrar o topo (filtros, banners)
+        await page.evaluate("window.scrollTo(0, 0)")
+        shot = await page.screenshot(path=str(SHOT_DIR / f"{store}_{slugify(url)[:80]}.jpg"),
+                                     type="jpeg", quality=DIAG_QUALITY, full_page=DIAG_FULL_PAGE)
+        nbytes += len(shot)
+        html = await page.content()
+        save_debug(f"html_{store}_{slugify(url)[:80]}.html", html)
+        nbytes += len(html.encode("utf-8"))
+    except: pass
+    DIAG.record(reason, time.monotonic() - t0, nbytes)
+    print(f"[{store}] diagnóstico ({reason}) {url}")
+
 # ─────────────────────────────────────────────────────────────
 # ALDI — 1) recolhe subcategorias; 2) visita e extrai produtos
 # ─────────────────────────────────────────────────────────────
@@ -229,8 +396,8 @@ async def aldi_parse_category_page(context, url: str, store: str) -> list[dict]:
     page = await context.new_page()
     extracted=[]
     try:
-        await page.goto(url, wait_until="domcontentloaded", timeout=90000)
-        await accept_cookies(page)
+        await goto(page, url, 90000)
+        await ensure_consent(page, context, url, CONSENT.state_for(url))
         await page.wait_for_timeout(800)
         await scroll_to_bottom(page); await load_more(page); await scroll_to_bottom(page)
 
@@ -239,32 +406,13 @@ async def aldi_parse_category_page(context, url: str, store: str) -> list[dict]:
         if ld: extracted.extend(ld)
 
         # DOM oficial do ALDI (SAP Commerce)
-        cards = await page.query_selector_all(".mod-article-tile, .product, .product-card, [data-test='product-tile']")
-        for c in cards:
-            name_el = await c.query_selector(".mod-article-tile__title, .product-title, .title, [data-test='product-title']")
-            price_el= await c.query_selector(".mod-article-tile__price, .price, [data-test='product-price'], [class*='price']")
-            size_el = await c.query_selector(".mod-article-tile__subtitle, .subtitle, .product-size, [data-test='product-subtitle']")
-            name = (await name_el.inner_text()).strip() if name_el else ""
-            price_txt = (await price_el.inner_text()).strip() if price_el else ""
-            size = (await size_el.inner_text()).strip() if size_el else ""
-            price=None
-            if price_txt:
-                m = re.search(r"(\d+(?:[.,]\d{1,2}))", price_txt.replace("\xa0"," ").replace(",",".")) 
-                if m:
-                    try: price=float(m.group(1))
-                    except: price=None
-            if name:
-                extracted.append({"name":name,"price":price,"size":size,"is_promo":False})
-
-        # debug da categoria
-        try:
-            await page.screenshot(path=str(SHOT_DIR / f"ALDI_{slugify(url)[:80]}.png"), full_page=True)
-            html = await page.content()
-            save_debug(f"html_ALDI_{slugify(url)[:80]}.html", html)
-        except: pass
+        extracted.extend(await extract_cards(page, store, DOM_SELECTORS["ALDI"]))
+
+        await diagnose(page, store, url, len(extracted))
 
     except Exception as e:
         print(f"[ALDI] erro em categoria {url}: {e}")
+        await diagnose(page, store, url, len(extracted), e)
     finally:
         await page.close()
 
@@ -272,9 +420,20 @@ async def aldi_parse_category_page(context, url: str, store: str) -> list[dict]:
 
 # ─────────────────────────────────────────────────────────────
 
-async def fetch_category(play, url: str, store: str):
+async def fetch_category(play, url: str, store: str, proxy=None, nav=None):
     offers = []
-    proxy = proxy_for(url)
+    nav = nav if nav is not None else {}
+
+    # modelo de API de um run anterior → a categoria toda por HTTP, sem browser
+    tpl = API.get(store, url)
+    if tpl:
+        t0 = time.monotonic()
+        items = await asyncio.to_thread(API.replay, store, url, tpl, json_items, 0, proxy)
+        if items is not None:
+            nav["secs"], nav["ok"] = time.monotonic() - t0, True
+            print(f"[{store}] API replay: {len(items)} itens em {nav['secs']:.1f}s")
+            return make_rows(items, store, url)
+
     br_name = browser_for(url)
     browser_type = {"chromium": play.chromium, "firefox": play.firefox, "webkit": play.webkit}.get(br_name, play.chromium)
 
@@ -282,9 +441,10 @@ async def fetch_category(play, url: str, store: str):
         headless=True,
         args=["--disable-blink-features=AutomationControlled","--no-sandbox","--disable-dev-shm-usage"],
     )
+    state = CONSENT.state_for(url)
     context = await browser.new_context(
         extra_http_headers=HEADERS, locale="fr-LU", timezone_id="Europe/Luxembourg", proxy=proxy,
-        viewport={"width": 1366, "height": 768}
+        viewport={"width": 1366, "height": 768}, storage_state=state
     )
     page = await context.new_page()
 
@@ -296,7 +456,7 @@ async def fetch_category(play, url: str, store: str):
                 if body and (body.lstrip().startswith("{") or body.lstrip().startswith("[")):
                     try:
                         data = json.loads(body)
-                        collected_json.append((resp.url, data))
+                        collected_json.append((resp.url, data, resp.request))
                         if is_debug():
                             sample = json.dumps(data)[:200000].encode("utf-8")
                             save_debug(f"net_{store}_{slugify(resp.url)[:80]}.json", sample)
@@ -305,10 +465,20 @@ async def fetch_category(play, url: str, store: str):
     page.on("response", on_response)
 
     try:
-        await page.goto(url, wait_until="domcontentloaded", timeout=120000)
-        await accept_cookies(page)
+        t0 = time.monotonic()
+        resp = await goto(page, url, 120000)
+        nav["secs"] = time.monotonic() - t0
+        # 403/429 na saída Tor = circuito bloqueado → conta como falha do endpoint
+        nav["ok"] = resp is None or resp.status not in (403, 429)
+        await ensure_consent(page, context, url, state)
         await page.wait_for_timeout(1200)
-        await scroll_to_bottom(page); await load_more(page); await scroll_to_bottom(page)
+
+        # XHR de listagem com paginação → páginas seguintes por HTTP em vez de load_more/scroll
+        more = None
+        if API_REPLAY and not (store == "ALDI" and "/produits.html" in url):
+            more = await replay_from_xhr(collected_json, store, url, proxy)
+        if more is None:
+            await scroll_to_bottom(page); await load_more(page); await scroll_to_bottom(page)
 
         # ALDI hub: recolhe subcategorias e percorre cada uma
         if store == "ALDI" and "/produits.html" in url:
@@ -317,25 +487,16 @@ async def fetch_category(play, url: str, store: str):
             for link in subcats:
                 rows = await aldi_parse_category_page(context, link, store)
                 offers.extend(rows)
-            # debug do hub
-            try:
-                await page.screenshot(path=str(SHOT_DIR / f"{store}_{slugify(url)[:80]}.png"), full_page=True)
-                html = await page.content()
-                save_debug(f"html_{store}_{slugify(url)[:80]}.html", html)
-            except: pass
+            # debug do hub: o nº de subcategorias é o "resultado" desta página
+            await diagnose(page, store, url, len(subcats))
             await context.close(); await browser.close()
             return offers
 
-        # screenshot (demais lojas)
-        try:
-            await page.screenshot(path=str(SHOT_DIR / f"{store}_{slugify(url)[:80]}.png"), full_page=True)
-        except: pass
-
         extracted=[]
-        # 1) JSON capturado
-        for u, data in collected_json:
-            tmp=[]; walk_json(data, tmp)
-            if tmp: extracted.extend(tmp)
+        # 1) JSON capturado (+ páginas vindas do replay)
+        for u, data, _ in collected_json:
+            extracted.extend(json_items(data))
+        extracted.extend(more or [])
         # 2) LD+JSON
         if not extracted:
             try:
@@ -344,83 +505,120 @@ async def fetch_category(play, url: str, store: str):
             except: pass
         # 3) DOM genérico
         if not extracted:
-            cards = await page.query_selector_all(
-                ".product, .product-card, li.product-item, .product-grid__item, "
-                "[data-test='product-tile'], .tile, .mod-article-tile"
-            )
-            for c in cards:
-                name_el = await c.query_selector(
-                    ".product-title, .product-item-name, .product__title, .title, "
-                    "[data-test='product-title'], .mod-article-tile__title"
-                )
-                price_el= await c.query_selector(
-                    ".price, .product-price, .product__price, .price__amount, "
-                    "[data-test='product-price'], .mod-article-tile__price, [class*='price']"
-                )
-                size_el = await c.query_selector(
-                    ".size, .product-size, .product__size, .subtitle, "
-                    "[data-test='product-subtitle'], .mod-article-tile__subtitle, [class*='size']"
-                )
-                name = (await name_el.inner_text()).strip() if name_el else ""
-                price_txt = (await price_el.inner_text()).strip() if price_el else ""
-                size = (await size_el.inner_text()).strip() if size_el else ""
-                price=None
-                if price_txt:
-                    m = re.search(r"(\d+(?:[.,]\d{1,2}))", price_txt.replace("\xa0"," ").replace(",",".")) 
-                    if m:
-                        try: price=float(m.group(1))
-                        except: price=None
-                if name: extracted.append({"name":name,"price":price,"size":size,"is_promo":False})
-
-        try:
-            html = await page.content()
-            save_debug(f"html_{store}_{slugify(url)[:80]}.html", html)
-        except: pass
+            extracted.extend(await extract_cards(page, store, dom_selectors(store)))
 
+        await diagnose(page, store, url, len(extracted))
         offers.extend(make_rows(extracted, store, url))
 
     except Exception as e:
         print(f"[{store}] erro em {url}: {e}")
+        nav["error"] = e   # o job não marca a categoria como concluída
+        await diagnose(page, store, url, len(offers), e)
     finally:
         await context.close(); await browser.close()
 
     return offers
 
-async def run_all():
-    all_offers=[]
+async def replay_from_xhr(collected_json, store: str, url: str, proxy=None):
+    """Aprende o modelo do XHR com mais produtos e busca as páginas seguintes.
+    None se não houver listagem paginada ou se o replay falhar."""
+    best, best_items = None, []
+    for u, data, req in list(collected_json):
+        items = json_items(data)
+        if len(items) > len(best_items): best, best_items = (u, req), items
+    if not best: return None
+    u, req = best
+    tpl = learn(u, req.method, req.headers, req.post_data, len(best_items))
+    if not tpl: return None
+    API.put(store, url, tpl)
+    prev = [it.get("name") for it in best_items]
+    more = await asyncio.to_thread(API.replay, store, url, tpl, json_items, 1, proxy, prev)
+    if more is not None:
+        print(f"[{store}] API aprendida ({tpl['kind']}={tpl['key']}): +{len(more)} itens por HTTP")
+    return more
+
+async def fetch_via_pool(play, url: str, store: str, nav=None):
+    """Domínios em USE_TOR_FOR recebem um endpoint do TOR_POOL por browser context.
+    `nav` recebe ok/secs/error da navegação (ok falso ou error = fetch falhado)."""
+    nav = nav if nav is not None else {}
+    if not uses_tor(url):
+        return await fetch_category(play, url, store, nav=nav)
+    ep = TOR_POOL.acquire()
+    try:
+        print(f"[{store}] {url} via {ep.server}")
+        return await fetch_category(play, url, store, proxy={"server": ep.server}, nav=nav)
+    finally:
+        TOR_POOL.release(ep, nav.get("ok", False), nav.get("secs"))
+
+async def run_all(shard=None, weighted=False, resume=False):
+    jobs = [(store, url) for store, urls in CATEGORIES.items() for url in urls]
+    orders = list(range(len(jobs)))
+    if shard:
+        keys = [shards.source_key(s, u) for s, u in jobs]
+        plan = shards.assign(keys, shard[1], shards.load_durations() if weighted else None)
+        orders = [i for i, k in enumerate(keys) if plan[k] == shard[0]]
+        jobs = [jobs[i] for i in orders]
+        print(f">> shard {shard[0]}/{shard[1]}: {len(jobs)} categorias")
+
+    # cada categoria vai direta para o seu parcial + journal (--resume salta as concluídas)
+    parts_dir = PARTS_DIR if shard else RUN_PARTS_DIR
+    if not shard and not resume: shards.clean(parts_dir)
+    journal = RunJournal(parts_dir, shards.shard_tag(shard), resume)
+    if resume:
+        todo = [(o, j) for o, j in zip(orders, jobs)
+                if not journal.is_done(shards.source_key(*j), shards.part_path(o, "ofertas", parts_dir))]
+        print(f">> --resume: {len(jobs) - len(todo)} categorias já concluídas saltadas")
+        orders, jobs = [o for o, _ in todo], [j for _, j in todo]
+
+    if any(uses_tor(u) for _, u in jobs):
+        healthy = await TOR_POOL.health_check()
+        print(f"[proxy] {len(healthy)}/{len(TOR_POOL)} endpoints SOCKS ativos; concorrência Tor = {TOR_CONCURRENCY}")
+
+    # Tor corre em paralelo (um circuito por contexto); o resto continua sequencial
+    tor_sem, direct_sem = asyncio.Semaphore(TOR_CONCURRENCY), asyncio.Semaphore(1)
+    durations = {}; total = 0
     async with async_playwright() as play:
-        for store, urls in CATEGORIES.items():
-            for url in urls:
-                tor = "[TOR]" if proxy_for(url) else ""
-                br  = browser_for(url)
-                print(f"[{store}] -> {url} {tor} ({br})")
-                offs = await fetch_category(play, url, store)
+        async def job(order, store, url):
+            tor = uses_tor(url)
+            key = shards.source_key(store, url)
+            async with (tor_sem if tor else direct_sem):
+                if LIMITER.is_open(url):
+                    # parcial vazio mas sem journal → um --resume volta a tentar
+                    print(f"[{store}] {host_of(url)} em pausa (circuit breaker) — salta {url}")
+                    shards.write_part(order, "ofertas", COLS, [], parts_dir)
+                    return 0
+                print(f"[{store}] -> {url} {'[TOR]' if tor else ''} ({browser_for(url)})")
+                t0 = time.monotonic(); nav = {}
+                try:
+                    offs = await fetch_via_pool(play, url, store, nav)
+                except Exception as e:   # launch/contexto do browser
+                    print(f"[{store}] erro em {url}: {e}")
+                    offs, nav["error"] = [], e
+                shards.write_part(order, "ofertas", COLS, offs, parts_dir)
+                if nav.get("error") or not nav.get("ok"):
+                    # falhou (erro, 403/429): parcial sem journal → um --resume volta a tentar
+                    print(f"[{store}] fetch falhou — {url} fica por concluir")
+                    return len(offs)
+                durations[key] = round(time.monotonic() - t0, 2)
+                journal.commit(key, order=order, rows=len(offs), secs=durations[key])
                 print(f"[{store}] +{len(offs)}")
-                all_offers.extend(offs)
-
-    cols = ["ProductUID","NomeProduto","Loja","Preco","Moeda","PrecoUnidade","Unidade","IsPromo","ValidadeDe","ValidadeAte","SourceURL","FetchedAt"]
-    with open(OFERTAS_FULL, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=cols); w.writeheader()
-        for r in all_offers: w.writerow(r)
-    print(f"✅ ofertas_full.csv: {len(all_offers)} linhas")
-
-# helpers de proxy/browser/host
-def proxy_for(url: str):
-    h = host_of(url)
-    for dom in USE_TOR_FOR:
-        if h.endswith(dom): return {"server": "socks5://127.0.0.1:9050"}
-    return None
-
-def browser_for(url: str):
-    h = host_of(url)
-    for dom, br in BROWSER_FOR.items():
-        if h.endswith(dom):
-            return br  # "chromium" | "firefox" | "webkit"
-    return "chromium"
-
-def host_of(url: str) -> str:
-    try: return urlparse(url).netloc.lower()
-    except: return ""
+                return len(offs)
+        total = sum(await asyncio.gather(*(job(o, s, u) for o, (s, u) in zip(orders, jobs))))
+    if any(uses_tor(u) for _, u in jobs):
+        TOR_POOL.report()
+    LIMITER.report(); CONSENT.report(); API.report(); dom_report(); DIAG.report()
+
+    shards.write_durations(shard, durations, parts_dir)
+    if shard:
+        print(f"✅ shard {shard[0]}/{shard[1]}: {total} linhas em {parts_dir} (junta com: python shards.py merge --dir {parts_dir})")
+        return
+    # parciais pela ordem original de CATEGORIES → ofertas_full.csv (rename atómico)
+    shards.merge(parts_dir, OFERTAS_FULL)
 
 if __name__ == "__main__":
-    asyncio.run(run_all())
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--shard", type=shards.parse_shard, help="i/N: corre só as categorias do shard i (1..N)")
+    ap.add_argument("--weighted", action="store_true", help="reparte pelos tempos de out/shard_durations.json")
+    ap.add_argument("--resume", action="store_true", help="continua um run interrompido (salta categorias no journal)")
+    a = ap.parse_args()
+    asyncio.run(run_all(shard=a.shard, weighted=a.weighted, resume=a.resume))
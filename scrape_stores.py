@@ -1,16 +1,30 @@
 # === scrape_stores.py — VERSION v4.0 (render + folder/next + OCR folheto) ===
-import os, re, csv, time, datetime, requests, yaml, random, io
+import os, re, json, time, datetime, yaml, io, glob, argparse, threading
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 from utils import parse_qty, unit_price, slugify
-from playwright.sync_api import sync_playwright, TimeoutError as PWTimeout
-from PIL import Image
-import pytesseract
+from ratelimit import LIMITER, polite_get, retry_after_of
+import shards
+from checkpoint import RunJournal
+from pipeline import Pipeline
+from consent_state import CONSENT, BANNER_SEL
+# Playwright, PIL e pytesseract só são importados quando são precisos (render / OCR):
+# um run só com HTTP arranca sem carregar o browser nem o Tesseract.
 
 OUT_DIR = "out"
 DEBUG_DIR = os.path.join(OUT_DIR, "debug")
 OFERTAS_FULL = os.path.join(OUT_DIR, "ofertas_full.csv")
 PROD_PRIMARY = os.path.join(OUT_DIR, "produtos_primary.csv")
+FETCH_STRATEGY = os.path.join(OUT_DIR, "fetch_strategy.json")
+RUN_PARTS_DIR = shards.OUT_DIR / "parts"   # parciais + journal do run em curso (--resume)
+
+# static-first: fontes com render: true tentam primeiro um GET simples e só sobem
+# para o browser se o HTML não trouxer produtos. A decisão fica em FETCH_STRATEGY.
+#   FETCH_MODE=auto (default) | render (sempre browser) | static (nunca browser)
+FETCH_MODE = os.getenv("FETCH_MODE", "auto").lower()
+STATIC_MIN_ITEMS = int(os.getenv("STATIC_MIN_ITEMS", "3"))     # cartões com preço p/ aceitar o estático
+STATIC_MIN_RATIO = float(os.getenv("STATIC_MIN_RATIO", "0.9"))  # fração da contagem do último render
+STATIC_RECHECK_DAYS = int(os.getenv("STATIC_RECHECK_DAYS", "14"))  # decisões (static e render) voltam a ser testadas
 
 UA = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
       "KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36")
@@ -28,22 +42,40 @@ def ensure_dirs():
     if DEBUG_HTML:
         os.makedirs(DEBUG_DIR, exist_ok=True)
 
-def http(url, tries=2):
-    last = None
-    for i in range(tries):
-        try:
-            r = requests.get(url, timeout=30, headers=REQ_HEADERS)
-            r.raise_for_status()
-            return r.text
-        except Exception as e:
-            last = e
-            time.sleep(1.2 + i*0.8)
-    raise last
+_session = None
+_session_lock = threading.Lock()
+_strategy_lock = threading.Lock()   # strategy: escrito pelas threads de fetch, copiado no flush
+
+def session():
+    # um Session partilhado → keep-alive e pool de ligações por host
+    global _session
+    with _session_lock:   # threads de fetch: uma só Session
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            s = requests.Session()
+            s.headers.update(REQ_HEADERS)
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+            s.mount("https://", adapter); s.mount("http://", adapter)
+            _session = s
+    return _session
+
+def http(url, tries=3):
+    return polite_get(url, tries=tries, session=session(), timeout=30).text
 
 def http_bytes(url):
-    r = requests.get(url, timeout=30, headers=REQ_HEADERS)
-    r.raise_for_status()
-    return r.content
+    return polite_get(url, session=session(), timeout=30).content
+
+def goto(page, url, timeout_ms):
+    # navegação do Playwright passa pelo mesmo limitador por host que o http()
+    LIMITER.wait(url)
+    try:
+        resp = page.goto(url, wait_until="load", timeout=timeout_ms)
+    except Exception:
+        LIMITER.record(url, None)
+        raise
+    LIMITER.record(url, resp.status if resp else 200, retry_after_of(resp))
+    return resp
 
 def auto_scroll(page, max_steps=24, step_px=1400, sleep_ms=350):
     last_h = 0
@@ -81,21 +113,46 @@ def try_accept_cookies(page):
             pass
     return False
 
+def banner_visible(page):
+    try: return page.locator(BANNER_SEL).first.is_visible()
+    except Exception: return False
+
+def ensure_consent(page, ctx, url, state):
+    """Com storage state válido e sem banner à vista, salta a rotina de cookies;
+    senão corre-a e guarda o estado do contexto para os próximos runs."""
+    if state and not banner_visible(page):
+        CONSENT.skipped(url)
+        return
+    if state: CONSENT.expire(url)
+    t0 = time.monotonic()
+    try_accept_cookies(page)
+    CONSENT.ran(url, time.monotonic() - t0)
+    if banner_visible(page): return  # não guardar um estado com o banner ainda aberto
+    try:
+        CONSENT.path(url).parent.mkdir(parents=True, exist_ok=True)
+        ctx.storage_state(path=str(CONSENT.path(url)))
+        CONSENT.saved(url)
+    except Exception:
+        pass
+
 def fetch_rendered_pages(url, wait_selector=None, scroll=False, next_selector=None, max_pages=3, timeout_ms=32000, open_first_folder=False, folder_card_selector="a[href]"):
+    from playwright.sync_api import sync_playwright, TimeoutError as PWTimeout
     htmls = []
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
-        ctx = browser.new_context(user_agent=UA, locale="fr-FR", viewport={"width":1280,"height":1600})
+        state = CONSENT.state_for(url)
+        ctx = browser.new_context(user_agent=UA, locale="fr-FR", viewport={"width":1280,"height":1600},
+                                  storage_state=state)
         page = ctx.new_page()
-        page.goto(url, wait_until="load", timeout=timeout_ms)
-        try_accept_cookies(page)
+        goto(page, url, timeout_ms)
+        ensure_consent(page, ctx, url, state)
         if open_first_folder:
             try:
                 # abre o primeiro folder visível (Lidl)
                 page.wait_for_selector(folder_card_selector, timeout=timeout_ms)
                 page.locator(folder_card_selector).first.click()
                 page.wait_for_load_state("load", timeout=timeout_ms)
-                try_accept_cookies(page)
+                ensure_consent(page, ctx, url, CONSENT.state_for(url))
             except Exception:
                 pass
         if wait_selector:
@@ -110,6 +167,7 @@ def fetch_rendered_pages(url, wait_selector=None, scroll=False, next_selector=No
                 try:
                     if not page.locator(next_selector).first.is_visible():
                         break
+                    LIMITER.wait(url)
                     page.locator(next_selector).first.click()
                     page.wait_for_load_state("load", timeout=timeout_ms)
                     if wait_selector:
@@ -177,8 +235,145 @@ def parse_cards(html, sel, base_url):
                     "promo": promo, "url": url, "img": img, "ean": ean})
     return out
 
+def ld_products(data):
+    # Product soltos, listas, @graph e ItemList → só os dicts de Product
+    if isinstance(data, list):
+        for d in data: yield from ld_products(d)
+    elif isinstance(data, dict):
+        t = data.get("@type")
+        if t == "Product" or (isinstance(t, list) and "Product" in t):
+            yield data
+        for k in ("@graph", "itemListElement", "item"):
+            if k in data: yield from ld_products(data[k])
+
+def ld_str(v):
+    # url/image em ld+json: string, lista, ImageObject {"url": ...} ou lista destes
+    if isinstance(v, list): v = v[0] if v else ""
+    if isinstance(v, dict): v = v.get("url") or v.get("contentUrl") or ""
+    return v if isinstance(v, str) else ""
+
+def parse_ld_json(html, base_url):
+    soup = BeautifulSoup(html or "", "html.parser")
+    out = []
+    for sc in soup.select("script[type='application/ld+json']"):
+        try: data = json.loads(sc.string or "")
+        except ValueError: continue
+        for d in ld_products(data):
+            name = str(d.get("name") or "").strip()
+            if not name: continue
+            offers = d.get("offers")
+            if isinstance(offers, list): offers = offers[0] if offers else {}
+            price = None
+            if isinstance(offers, dict):
+                try: price = float(str(offers.get("price") or offers.get("lowPrice")).replace(",","."))
+                except ValueError: price = None
+            brand = d.get("brand")
+            if isinstance(brand, dict): brand = brand.get("name")
+            img, link = ld_str(d.get("image")), ld_str(d.get("url"))
+            out.append({"name": name, "brand": str(brand or ""), "qty": str(d.get("size") or d.get("weight") or ""),
+                        "price": price, "promo": False,
+                        "url": urljoin(base_url, link) if link else "",
+                        "img": urljoin(base_url, img) if img else "",
+                        "ean": str(d.get("gtin13") or d.get("gtin") or "")})
+    return out
+
+def extract_items(html, sel, base_url):
+    return parse_cards(html, sel, base_url) or parse_ld_json(html, base_url)
+
+def load_strategy(path=FETCH_STRATEGY):
+    if not os.path.exists(path): return {}
+    with open(path, encoding="utf-8") as f: return json.load(f)
+
+def save_strategy(strategy, path=FETCH_STRATEGY):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f: json.dump(strategy, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def static_pages(url, next_selector=None, max_pages=3):
+    """GET simples; segue o link de next_selector (se for um <a href>) até max_pages."""
+    htmls = [http(url)]
+    while next_selector and len(htmls) < max_pages:
+        a = BeautifulSoup(htmls[-1], "html.parser").select_one(next_selector)
+        nxt = urljoin(url, a["href"]) if a is not None and a.has_attr("href") else ""
+        if not nxt or nxt == url: break
+        htmls.append(http(nxt)); url = nxt
+    return htmls
+
+def priced_items(pages_html, sel, base_url):
+    return sum(1 for h in pages_html for it in extract_items(h, sel, base_url) if it["price"] is not None)
+
+def static_ok(n_static, n_rendered):
+    # a lista completa (scroll/next) só se vê no browser → o estático tem de chegar
+    # perto do que o último render encontrou, não só a STATIC_MIN_ITEMS
+    return bool(n_rendered) and n_static >= STATIC_MIN_ITEMS and n_static >= STATIC_MIN_RATIO * n_rendered
+
+def fetch_pages(code, src, sel, base_url, strategy):
+    """Devolve o HTML das páginas da fonte; com render: true tenta o estático primeiro.
+    strategy[chave] = {"mode": "static"|"render", "items": n estático, "rendered": n do
+    último render, "checked": data} é atualizado. Sem contagem de render, ou com a decisão
+    mais velha que STATIC_RECHECK_DAYS, corre os dois e compara."""
+    url = src.get("url")
+    next_sel, max_pages = src.get("next_selector"), int(src.get("max_pages", 3))
+    render = lambda: fetch_rendered_pages(
+        url,
+        wait_selector=sel.get("card"),
+        scroll=bool(src.get("scroll")),
+        next_selector=next_sel,
+        max_pages=max_pages,
+        open_first_folder=bool(src.get("open_first_folder"))
+    )
+    if not src.get("render") or FETCH_MODE == "static":
+        return static_pages(url, next_sel, max_pages)
+    if FETCH_MODE == "render" or src.get("open_first_folder"):   # a pasta só abre no browser
+        return render()
+
+    key = shards.source_key(code, url)
+    with _strategy_lock: prev = strategy.get(key, {})
+    today = datetime.date.today()
+    try: age = (today - datetime.date.fromisoformat(prev.get("checked", ""))).days
+    except ValueError: age = None
+    # "rendered": 0 também conta (render sem produtos → fica em render até ao recheck)
+    fresh = age is not None and age < STATIC_RECHECK_DAYS and "rendered" in prev
+
+    def try_static():
+        try:
+            pages_html = static_pages(url, next_sel, max_pages)
+            return pages_html, priced_items(pages_html, sel, base_url)
+        except Exception as e:
+            print(f"[{code}] estático falhou ({e}) em {url}")
+            return [], 0
+
+    def render_counted():
+        pages_html = render()
+        return pages_html, priced_items(pages_html, sel, base_url)
+
+    if fresh and prev.get("mode") == "render":
+        return render()
+    if fresh and prev.get("mode") == "static":
+        pages_html, n = try_static()
+        if static_ok(n, prev["rendered"]):
+            with _strategy_lock: strategy[key] = {**prev, "items": n}
+            return pages_html
+        print(f"[{code}] estático caiu para {n} (render tinha {prev['rendered']}) → render: {url}")
+        pages_r, nr = render_counted()
+        with _strategy_lock: strategy[key] = {"mode": "render", "items": n, "rendered": nr, "checked": today.isoformat()}
+        return pages_r
+
+    # sem contagem de render ou decisão antiga: estático e render lado a lado
+    pages_html, n = try_static()
+    pages_r, nr = render_counted()
+    ok = static_ok(n, nr)
+    if ok and prev.get("mode") != "static": print(f"[{code}] estático chega ({n}/{nr} produtos) → sem browser: {url}")
+    if not ok: print(f"[{code}] estático insuficiente ({n}/{nr} produtos) → render: {url}")
+    with _strategy_lock:
+        strategy[key] = {"mode": "static" if ok else "render", "items": n, "rendered": nr, "checked": today.isoformat()}
+    return pages_r
+
 def ocr_prices_from_image(img_bytes):
     # OCR básico: extrai números tipo 1,99 / 2.49 / € 3,79
+    from PIL import Image
+    import pytesseract
     img = Image.open(io.BytesIO(img_bytes))
     txt = pytesseract.image_to_string(img, lang="eng+fra")
     txt = txt.replace(",", ".")
@@ -234,128 +429,191 @@ def scrape_leaflet_images(url, image_selector, base_url, store_name, store_code,
             continue
     return rows
 
-def main():
-    print(">> Running scrape_stores.py v4.0")
-    ensure_dirs()
-    stores = load_config()
-
-    ofertas_rows = []
-    produtos_map = {}
-    now = datetime.datetime.utcnow().replace(microsecond=0).isoformat()+"Z"
+COLS_OFERTAS = ["ProductUID","EAN","NomeProduto","Loja","Store","Country","Preco","Moeda",
+                "PrecoUnidade","Unidade","IsPromo","ValidadeDe","ValidadeAte",
+                "SourceURL","SourceType","FetchedAt"]
+COLS_PRODUTOS = ["UID","EAN","Nome","Marca","Rayon","SousRayon","Tamanho","Imagem","Fonte","ScoreInicial"]
 
+def iter_sources(stores):
+    """(ordem global, loja, índice na loja, fonte) — a ordem global é a mesma em todos os shards."""
+    order = 0
     for store in stores:
-        code     = store.get("code", "STORE")
-        name     = store.get("name", code)
-        country  = store.get("country", "LU")
-        base     = store.get("base_url", "")
-        sel      = store.get("selectors", {})
-        sources  = store.get("sources", [])
-
-        for idx, src in enumerate(sources):
-            stype  = src.get("type")
-            url    = src.get("url")
-            render = bool(src.get("render"))
-            scroll = bool(src.get("scroll"))
-            next_sel = src.get("next_selector")
-            max_pages = int(src.get("max_pages", 3))
-            open_first_folder = bool(src.get("open_first_folder"))
-            image_selector = src.get("image_selector")
-            if not url or not stype: continue
+        for idx, src in enumerate(store.get("sources", [])):
+            if src.get("url") and src.get("type"):
+                yield order, store, idx, src
+            order += 1
+
+def replay_pages(replay_dir, code, idx):
+    # páginas gravadas com DEBUG_HTML=1 ({code}_{idx}_{página}.html)
+    paths = sorted(glob.glob(os.path.join(replay_dir, f"{code}_{idx:02d}_*.html")))
+    out = []
+    for p in paths:
+        with open(p, encoding="utf-8") as f: out.append(f.read())
+    return out
 
+def fetch_source(store, idx, src, now, replay_dir=None, strategy=None):
+    """I/O de uma fonte (thread de fetch) → argumentos do parse_source."""
+    code, url, stype = store.get("code", "STORE"), src.get("url"), src.get("type")
+    image_selector = src.get("image_selector")
+    pages_html, ready = [], []
+    # exceções seguem para o Pipeline → o writer escreve o parcial vazio sem journal
+    if stype == "leaflet_images" and image_selector:
+        if not replay_dir:  # OCR precisa das imagens reais
+            ready = scrape_leaflet_images(url, image_selector, store.get("base_url", ""),
+                                          store.get("name", code), code, store.get("country", "LU"), now)
+    elif stype == "pdf":
+        pages_html = []
+    elif replay_dir:
+        pages_html = replay_pages(replay_dir, code, idx)
+    else:
+        pages_html = fetch_pages(code, src, store.get("selectors", {}), store.get("base_url", ""),
+                                 strategy if strategy is not None else {})
+
+    if DEBUG_HTML and not replay_dir:
+        for p_i, h in enumerate(pages_html):
+            path = os.path.join(DEBUG_DIR, f"{code}_{idx:02d}_{p_i:02d}.html")
             try:
-                if stype == "leaflet_images" and image_selector:
-                    rows = scrape_leaflet_images(url, image_selector, base, name, code, country, now)
-                    ofertas_rows.extend(rows)
-                    continue
-
-                pages_html = []
-                if stype == "pdf":
-                    pages_html = []
-                else:
-                    wait_sel = sel.get("card")
-                    if render:
-                        pages_html = fetch_rendered_pages(
-                            url,
-                            wait_selector=wait_sel,
-                            scroll=scroll,
-                            next_selector=next_sel,
-                            max_pages=max_pages,
-                            open_first_folder=open_first_folder
-                        )
-                    else:
-                        pages_html = [http(url)]
-            except Exception as e:
-                print(f"[{code}] erro {e} em {url}")
-                continue
-
-            if DEBUG_HTML:
-                for p_i, h in enumerate(pages_html):
-                    path = os.path.join(DEBUG_DIR, f"{code}_{idx:02d}_{p_i:02d}.html")
-                    try:
-                        with open(path,"w",encoding="utf-8") as f: f.write(h)
-                    except Exception:
-                        pass
-
-            for html in pages_html:
-                items = []
-                if stype in ("category", "offers_page"):
-                    items = parse_cards(html, sel, base)
-                else:
-                    continue
-
-                for it in items:
-                    uid = it["ean"] if it["ean"] else slugify(it["name"], it["brand"], it["qty"])
-                    qv, baseu = parse_qty(it["qty"])
-                    pu, unit  = unit_price(it["price"], qv, baseu)
-
-                    ofertas_rows.append({
-                        "ProductUID": uid,
-                        "EAN": it["ean"],
-                        "NomeProduto": it["name"],
-                        "Loja": name,
-                        "Store": code,
-                        "Country": country,
-                        "Preco": it["price"] if it["price"] is not None else "",
-                        "Moeda": "EUR",
-                        "PrecoUnidade": pu or "",
-                        "Unidade": unit or "",
-                        "IsPromo": "TRUE" if stype in ("offers_page","pdf") else ("TRUE" if it["promo"] else "FALSE"),
-                        "ValidadeDe": "",
-                        "ValidadeAte": "",
-                        "SourceURL": it["url"],
-                        "SourceType": "folheto" if stype in ("offers_page","pdf") else "categoria",
-                        "FetchedAt": now
-                    })
-
-                    if uid not in produtos_map:
-                        produtos_map[uid] = {
-                            "UID": uid,
-                            "EAN": it["ean"],
-                            "Nome": it["name"],
-                            "Marca": it["brand"],
-                            "Rayon": "",
-                            "SousRayon": "",
-                            "Tamanho": it["qty"],
-                            "Imagem": it["img"],
-                            "Fonte": code,
-                            "ScoreInicial": 5.0
-                        }
-            time.sleep(0.25 + random.random()*0.25)
-
-    # write outputs
-    cols_o = ["ProductUID","EAN","NomeProduto","Loja","Store","Country","Preco","Moeda",
-              "PrecoUnidade","Unidade","IsPromo","ValidadeDe","ValidadeAte",
-              "SourceURL","SourceType","FetchedAt"]
-    with open(OFERTAS_FULL, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=cols_o); w.writeheader()
-        for r in ofertas_rows: w.writerow(r)
-    print(f"✅ ofertas_full.csv ({len(ofertas_rows)} linhas)")
-
-    cols_p = ["UID","EAN","Nome","Marca","Rayon","SousRayon","Tamanho","Imagem","Fonte","ScoreInicial"]
-    with open(PROD_PRIMARY, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=cols_p); w.writeheader()
-        for r in produtos_map.values(): w.writerow(r)
-    print(f"✅ produtos_primary.csv ({len(produtos_map)} itens)")
+                with open(path,"w",encoding="utf-8") as f: f.write(h)
+            except Exception:
+                pass
+    return store, src, now, pages_html, ready
+
+def parse_source(store, src, now, pages_html, ready=()):
+    """HTML de uma fonte → (linhas de ofertas, linhas de produtos). Só CPU: corre no pool de processos."""
+    code     = store.get("code", "STORE")
+    name     = store.get("name", code)
+    country  = store.get("country", "LU")
+    base     = store.get("base_url", "")
+    sel      = store.get("selectors", {})
+    stype    = src.get("type")
+
+    ofertas_rows, produtos_rows = list(ready), []
+    for html in pages_html:
+        items = []
+        if stype in ("category", "offers_page"):
+            items = extract_items(html, sel, base)
+        else:
+            continue
+
+        for it in items:
+            uid = it["ean"] if it["ean"] else slugify(it["name"], it["brand"], it["qty"])
+            qv, baseu = parse_qty(it["qty"])
+            pu, unit  = unit_price(it["price"], qv, baseu)
+
+            ofertas_rows.append({
+                "ProductUID": uid,
+                "EAN": it["ean"],
+                "NomeProduto": it["name"],
+                "Loja": name,
+                "Store": code,
+                "Country": country,
+                "Preco": it["price"] if it["price"] is not None else "",
+                "Moeda": "EUR",
+                "PrecoUnidade": pu or "",
+                "Unidade": unit or "",
+                "IsPromo": "TRUE" if stype in ("offers_page","pdf") else ("TRUE" if it["promo"] else "FALSE"),
+                "ValidadeDe": "",
+                "ValidadeAte": "",
+                "SourceURL": it["url"],
+                "SourceType": "folheto" if stype in ("offers_page","pdf") else "categoria",
+                "FetchedAt": now
+            })
+
+            produtos_rows.append({
+                "UID": uid,
+                "EAN": it["ean"],
+                "Nome": it["name"],
+                "Marca": it["brand"],
+                "Rayon": "",
+                "SousRayon": "",
+                "Tamanho": it["qty"],
+                "Imagem": it["img"],
+                "Fonte": code,
+                "ScoreInicial": 5.0
+            })
+    return ofertas_rows, produtos_rows
+
+def flush_strategy(strategy, loaded):
+    # só as decisões deste run por cima do ficheiro atual (outros shards podem tê-lo escrito)
+    disk = load_strategy()
+    with _strategy_lock: mine = dict(strategy)   # cópia: threads de fetch escrevem
+    disk.update({k: v for k, v in mine.items() if loaded.get(k) != v})
+    save_strategy(disk)
+    return disk
+
+def main(shard=None, weighted=False, replay_dir=None, resume=False):
+    print(">> Running scrape_stores.py v4.0" + (f" (shard {shard[0]}/{shard[1]})" if shard else "")
+          + (" --resume" if resume else ""))
+    ensure_dirs()
+    stores = load_config()
+    sources = list(iter_sources(stores))
+    if shard:
+        keys = [shards.source_key(st.get("code","STORE"), src["url"]) for _, st, _, src in sources]
+        plan = shards.assign(keys, shard[1], shards.load_durations() if weighted else None)
+        sources = [s for s, k in zip(sources, keys) if plan[k] == shard[0]]
+        print(f">> {len(sources)} fontes neste shard")
+
+    # cada fonte vai direta para o seu parcial (nada acumula em memória); o journal
+    # regista as fontes concluídas para o --resume. Sem shard, o fim do run junta os
+    # parciais nos CSV finais (rename atómico).
+    parts_dir = shards.PARTS_DIR if shard else RUN_PARTS_DIR
+    if not shard and not resume: shards.clean(parts_dir)
+    journal = RunJournal(parts_dir, shards.shard_tag(shard), resume)
+
+    durations = {}
+    loaded = load_strategy(); strategy = dict(loaded)
+    now = datetime.datetime.utcnow().replace(microsecond=0).isoformat()+"Z"
+    todo = []
+    for job in sources:
+        order, store, idx, src = job
+        if resume and journal.is_done(shards.source_key(store.get("code","STORE"), src["url"]),
+                                      shards.part_path(order, "ofertas", parts_dir),
+                                      shards.part_path(order, "produtos", parts_dir)):
+            continue
+        todo.append(job)
+    skipped = len(sources) - len(todo)
+
+    # threads de fetch → processos de parse → este loop é o único writer
+    pipe = Pipeline(lambda job: fetch_source(job[1], job[2], job[3], now, replay_dir, strategy), parse_source)
+    for (order, store, idx, src), res, err, secs in pipe.run(todo):
+        code = store.get("code","STORE")
+        key = shards.source_key(code, src["url"])
+        if err is not None:
+            # parcial vazio mas sem journal → um --resume volta a tentar
+            print(f"[{code}] erro {err} em {src['url']}")
+            shards.write_part(order, "ofertas", COLS_OFERTAS, [], parts_dir)
+            shards.write_part(order, "produtos", COLS_PRODUTOS, [], parts_dir)
+            continue
+        rows, prods = res
+        produtos_map = {}
+        for p in prods: produtos_map.setdefault(p["UID"], p)
+        # parcial por fonte (mesmo vazio, para não sobrar um parcial antigo no merge)
+        shards.write_part(order, "ofertas", COLS_OFERTAS, rows, parts_dir)
+        shards.write_part(order, "produtos", COLS_PRODUTOS, produtos_map.values(), parts_dir)
+        durations[key] = round(secs, 2)
+        journal.commit(key, order=order, rows=len(rows), secs=durations[key])
+        print(f"[{code}] +{len(rows)} ({src['url']})")
+        if not replay_dir and strategy != loaded:
+            flush_strategy(strategy, loaded)
+    pipe.report()
+    if skipped: print(f">> --resume: {skipped} fontes já concluídas saltadas")
+
+    if not replay_dir:
+        modes = [v["mode"] for v in flush_strategy(strategy, loaded).values()]
+        print(f">> fetch: {modes.count('static')} fontes estáticas, {modes.count('render')} com browser ({FETCH_STRATEGY})")
+
+    shards.write_durations(shard, durations, parts_dir)
+    if shard:
+        print(f"✅ shard {shard[0]}/{shard[1]}: parciais em {parts_dir} (junta com: python shards.py merge)")
+    else:
+        shards.merge(parts_dir, OFERTAS_FULL, PROD_PRIMARY)
+    LIMITER.report(); CONSENT.report()
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--shard", type=shards.parse_shard, help="i/N: corre só as fontes do shard i (1..N)")
+    ap.add_argument("--weighted", action="store_true", help="reparte pelos tempos de out/shard_durations.json")
+    ap.add_argument("--replay", metavar="DIR", help="lê páginas gravadas (DEBUG_HTML) em vez de ir à rede")
+    ap.add_argument("--resume", action="store_true", help="continua um run interrompido (salta fontes no journal)")
+    a = ap.parse_args()
+    main(shard=a.shard, weighted=a.weighted, replay_dir=a.replay, resume=a.resume)
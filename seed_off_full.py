@@ -1,6 +1,7 @@
-import os, csv, math, time, requests, re
+import os, csv, math, re
 from urllib.parse import urlencode
 from utils import slugify
+from ratelimit import polite_get
 
 OUT_DIR = "out"
 OUT_PATH = os.path.join(OUT_DIR, "produtos_off.csv")
@@ -18,8 +19,7 @@ def fetch_off_page(page, country):
         "sort_by":"unique_scans_n"
     }
     url = OFF_URL+"?"+urlencode(params)
-    r = requests.get(url, timeout=30); r.raise_for_status()
-    return r.json()
+    return polite_get(url, timeout=30).json()
 
 def main():
     os.makedirs(OUT_DIR, exist_ok=True)
@@ -45,7 +45,6 @@ def main():
                     "OFFPrice": (p.get("price") or "")
                 })
                 seen.add(uid)
-            time.sleep(0.25)
 
     cols=["UID","EAN","Nome","Marca","Rayon","SousRayon","Tamanho","Imagem","Fonte","ScoreInicial","OFFPrice"]
     with open(OUT_PATH,"w",newline="",encoding="utf-8") as f:
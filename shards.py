@@ -0,0 +1,148 @@
+import os, csv, json, glob, hashlib, argparse
+from pathlib import Path
+from checkpoint import PartWriter
+
+# Modo shard: cada fonte (loja, url) vai para um shard fixo; cada shard escreve
+# ficheiros parciais por fonte em PARTS_DIR e o `merge` junta tudo nos CSV habituais.
+#   python scrape_stores.py --shard 1/3      (shards numerados de 1 a N)
+#   python shards.py merge
+#   python shards.py clean                    (antes de um run novo)
+#   python shards.py plan 3 [--weighted]
+
+OUT_DIR        = Path("out")
+PARTS_DIR      = OUT_DIR / "shards"
+DURATIONS      = OUT_DIR / "shard_durations.json"
+OFERTAS_FULL   = OUT_DIR / "ofertas_full.csv"
+PROD_PRIMARY   = OUT_DIR / "produtos_primary.csv"
+
+def parse_shard(s: str):
+    """'2/4' → (2, 4). Shards numerados a partir de 1."""
+    try:
+        i, n = (int(x) for x in s.split("/", 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard inválido: {s!r} (usa i/N, ex.: 1/3)")
+    if not (n >= 1 and 1 <= i <= n):
+        raise argparse.ArgumentTypeError(f"shard fora do intervalo: {s!r}")
+    return i, n
+
+def source_key(store: str, url: str) -> str:
+    return f"{store}|{url}"
+
+def stable_hash(key: str) -> int:
+    # hashlib (e não hash()) → igual em todas as máquinas/processos
+    return int.from_bytes(hashlib.sha1(key.encode("utf-8")).digest()[:8], "big")
+
+def load_durations(path=DURATIONS):
+    if not path.exists(): return {}
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+def assign(keys, n, durations=None):
+    """Devolve {key: shard (1..N)}.
+    Sem durações: hash da chave mod N. Com durações: greedy LPT determinístico
+    (fontes mais longas primeiro, cada uma para o shard menos carregado)."""
+    if not durations:
+        return {k: stable_hash(k) % n + 1 for k in keys}
+    known = sorted(v for k, v in durations.items() if k in keys)
+    default = known[len(known)//2] if known else 1.0
+    cost = {k: max(durations.get(k, default), 0.1) for k in keys}
+    load, count = [0.0] * n, [0] * n
+    out = {}
+    for k in sorted(keys, key=lambda k: (-cost[k], stable_hash(k))):
+        s = min(range(n), key=lambda i: (load[i], count[i], i))
+        load[s] += cost[k]; count[s] += 1
+        out[k] = s + 1
+    return out
+
+def part_path(order: int, kind: str, parts_dir=PARTS_DIR) -> Path:
+    # o índice global da fonte no nome → o merge reproduz a ordem de um run único
+    return parts_dir / f"{order:04d}.{kind}.csv"
+
+def write_part(order: int, kind: str, cols, rows, parts_dir=PARTS_DIR):
+    with PartWriter(part_path(order, kind, parts_dir), cols) as w:
+        w.write(rows)
+    return w.rows
+
+def shard_tag(shard) -> str:
+    # sufixo dos ficheiros por processo (journal/durações); run sem shard = 1of1
+    i, n = shard or (1, 1)
+    return f".{i}of{n}"
+
+def write_durations(shard, durations, parts_dir=PARTS_DIR):
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    with (parts_dir / f"durations{shard_tag(shard)}.json").open("w", encoding="utf-8") as f:
+        json.dump(durations, f, indent=1)
+
+def clean(parts_dir=PARTS_DIR):
+    # antes de um run novo: parciais de fontes que já não existem não podem entrar no merge
+    for pat in ("*.csv", "*.part", "durations.*.json", "journal*.jsonl"):
+        for p in glob.glob(os.path.join(parts_dir, pat)):
+            os.remove(p)
+
+def read_parts(kind: str, parts_dir=PARTS_DIR):
+    for path in sorted(glob.glob(str(parts_dir / f"*.{kind}.csv"))):
+        with open(path, newline="", encoding="utf-8") as f:
+            r = csv.DictReader(f)
+            yield r.fieldnames or [], r
+
+def merge(parts_dir=PARTS_DIR, out_full=OFERTAS_FULL, out_primary=PROD_PRIMARY):
+    """Junta os parciais (por ordem de fonte) nos CSV finais, em streaming.
+    Escreve para .tmp e faz rename no fim → nunca fica um CSV final a meio."""
+    n_off = n_prod = 0
+    out_full, out_primary = Path(out_full), Path(out_primary)
+    w = f = None
+    for fieldnames, reader in read_parts("ofertas", parts_dir):
+        if w is None:
+            f = open(out_full.with_suffix(".tmp"), "w", newline="", encoding="utf-8")
+            w = csv.DictWriter(f, fieldnames=fieldnames); w.writeheader()
+        for r in reader:
+            w.writerow(r); n_off += 1
+    if f:
+        f.close(); os.replace(out_full.with_suffix(".tmp"), out_full)
+
+    seen = set(); w = f = None
+    for fieldnames, reader in read_parts("produtos", parts_dir):
+        if w is None:
+            f = open(out_primary.with_suffix(".tmp"), "w", newline="", encoding="utf-8")
+            w = csv.DictWriter(f, fieldnames=fieldnames); w.writeheader()
+        for r in reader:
+            if r["UID"] in seen: continue
+            seen.add(r["UID"]); w.writerow(r); n_prod += 1
+    if f:
+        f.close(); os.replace(out_primary.with_suffix(".tmp"), out_primary)
+
+    # durações de cada processo → histórico usado pelo --weighted (média móvel)
+    hist = load_durations()
+    for path in sorted(glob.glob(str(parts_dir / "durations.*.json"))):
+        with open(path, encoding="utf-8") as fh:
+            for k, v in json.load(fh).items():
+                hist[k] = round(v if k not in hist else 0.5 * hist[k] + 0.5 * v, 2)
+    if hist:
+        DURATIONS.parent.mkdir(exist_ok=True)
+        with DURATIONS.open("w", encoding="utf-8") as fh:
+            json.dump(hist, fh, indent=1, sort_keys=True)
+
+    print(f"✅ {out_full.name}: {n_off} linhas (de {parts_dir})")
+    if n_prod: print(f"✅ {out_primary.name}: {n_prod} itens (de {parts_dir})")
+    return n_off, n_prod
+
+def main():
+    ap = argparse.ArgumentParser(description="Shards do scrape: plano e merge dos parciais")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    m = sub.add_parser("merge"); m.add_argument("--dir", default=str(PARTS_DIR))
+    c = sub.add_parser("clean"); c.add_argument("--dir", default=str(PARTS_DIR))
+    p = sub.add_parser("plan"); p.add_argument("n", type=int); p.add_argument("--weighted", action="store_true")
+    a = ap.parse_args()
+    if a.cmd == "merge":
+        merge(Path(a.dir))
+    elif a.cmd == "clean":
+        clean(a.dir)
+    else:
+        from scrape_stores import load_config
+        keys = [source_key(s.get("code","STORE"), src.get("url"))
+                for s in load_config() for src in s.get("sources", []) if src.get("url")]
+        plan = assign(keys, a.n, load_durations() if a.weighted else None)
+        for k in keys: print(plan[k], k)
+
+if __name__ == "__main__":
+    main()
@@ -12,3 +12,20 @@ def slugify(*parts) -> str:
 
 def now_iso() -> str:
     return datetime.datetime.utcnow().isoformat()+"Z"
+
+# quantidades: "500 g" → (0.5, "kg"), "6 x 33 cl" → (1.98, "l"), "12 pcs" → (12, "un")
+QTY_UNITS = {"kg": (1, "kg"), "g": (0.001, "kg"), "mg": (0.000001, "kg"),
+             "l": (1, "l"), "cl": (0.01, "l"), "ml": (0.001, "l"), "dl": (0.1, "l"),
+             "pcs": (1, "un"), "pc": (1, "un"), "pces": (1, "un"), "st": (1, "un"), "un": (1, "un")}
+QTY_RE = re.compile(r"(?:(\d+)\s*[x×]\s*)?(\d+(?:[.,]\d+)?)\s*(kg|mg|g|cl|ml|dl|l|pcs|pces|pc|st|un)\b", re.I)
+
+def parse_qty(s):
+    m = QTY_RE.search(s or "")
+    if not m: return None, None
+    mult = int(m.group(1)) if m.group(1) else 1
+    factor, base = QTY_UNITS[m.group(3).lower()]
+    return round(mult * float(m.group(2).replace(",", ".")) * factor, 6), base
+
+def unit_price(price, qty, base):
+    if price is None or not qty: return None, None
+    return round(price / qty, 2), base